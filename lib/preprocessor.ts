@@ -1,7 +1,7 @@
 import 'openai/shims/node';
 import { z } from 'zod';
 import { getOpenAIClient } from './openai';
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import path from 'path';
 
 export interface PreprocessedData {
@@ -48,14 +48,227 @@ export async function preprocessTranscript(transcript: string, onStatus: (step:
   return preprocessedData;
 }
 
+// Clean up HTML entities and common transcription errors
+function cleanTranscript(transcript: string): string {
+  return transcript
+    .replace(/&amp;/g, '&')
+    .replace(/&lt;/g, '<')
+    .replace(/&gt;/g, '>')
+    .replace(/&quot;/g, '"')
+    .replace(/&#39;/g, "'")
+    .replace(/&nbsp;/g, ' ')
+    // Fix common transcription errors
+    .replace(/\bNN\b/g, 'n8n')
+    .replace(/\bnadn\b/gi, 'n8n')
+    .replace(/\bn a d n\b/gi, 'n8n');
+}
+
+function getPythonCommand(): string {
+  // Use python3 or python depending on system
+  return process.platform === 'win32' ? 'python' : 'python3';
+}
+
+interface PendingRequest {
+  payload: Record<string, unknown>;
+  resolve: (value: any) => void;
+  reject: (error: Error) => void;
+  onStatus: (step: string) => void;
+}
+
+// Longest a single request may run before the worker is considered hung
+const REQUEST_TIMEOUT_MS = Number(process.env.PREPROCESS_TIMEOUT_MS) || 120000;
+
+/**
+ * Long-lived `smart_preprocess.py --serve` process. The models are loaded once
+ * and every transcript is sent as a newline-delimited JSON request, so only the
+ * first call pays the model start-up cost. The worker handles requests in
+ * order, which lets STATUS lines on stderr be routed to the oldest pending one.
+ * A request that runs longer than REQUEST_TIMEOUT_MS fails and the worker is
+ * killed; the requests queued behind it are sent to a fresh worker.
+ */
+class PreprocessWorker {
+  private process: ChildProcessWithoutNullStreams;
+  private pending = new Map<number, PendingRequest>();
+  private nextId = 1;
+  private stdoutBuffer = '';
+  private stderrBuffer = '';
+  private exited = false;
+  private timer: NodeJS.Timeout | null = null;
+  private markFailed: (error: Error) => void = () => undefined;
+  private readonly onExit: () => void;
+  readonly ready: Promise<void>;
+
+  constructor(onExit: () => void) {
+    this.onExit = onExit;
+    const scriptPath = path.join(process.cwd(), 'scripts', 'smart_preprocess.py');
+    console.log('Starting preprocessing worker:', scriptPath);
+
+    this.process = spawn(getPythonCommand(), [scriptPath, '--serve'], {
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
+    });
+
+    let markReady: () => void;
+    this.ready = new Promise<void>((resolve, reject) => {
+      markReady = resolve;
+      this.markFailed = reject;
+    });
+    // Avoid unhandled rejections when nobody is waiting on start-up
+    this.ready.catch(() => undefined);
+
+    this.process.stdout.on('data', (data) => {
+      this.stdoutBuffer += data.toString();
+      let newline: number;
+      while ((newline = this.stdoutBuffer.indexOf('\n')) >= 0) {
+        const line = this.stdoutBuffer.slice(0, newline).trim();
+        this.stdoutBuffer = this.stdoutBuffer.slice(newline + 1);
+        if (line) this.handleMessage(line, markReady);
+      }
+    });
+
+    this.process.stderr.on('data', (data) => {
+      this.stderrBuffer += data.toString();
+      const lines = this.stderrBuffer.split('\n');
+      this.stderrBuffer = lines.pop() || '';
+      lines.forEach((line: string) => {
+        if (line.startsWith('STATUS:')) {
+          const current = this.pending.values().next().value as PendingRequest | undefined;
+          current?.onStatus(line.replace('STATUS:', '').trim());
+        } else if (line.trim()) {
+          console.log('Preprocessing worker stderr:', line);
+        }
+      });
+    });
+
+    this.process.on('exit', (code) => {
+      console.log('Preprocessing worker exited with code:', code);
+      this.shutdown(new Error(`Preprocessing worker exited with code ${code}`));
+    });
+
+    // A failed spawn (ENOENT, EAGAIN) emits 'error' without 'exit'
+    this.process.on('error', (error) => {
+      console.error('Preprocessing worker error:', error);
+      this.shutdown(new Error(`Failed to start Python process: ${error}`));
+      this.process.kill();
+    });
+
+    // Writes to a worker that just died; the 'exit' handler fails the requests
+    this.process.stdin.on('error', (error) => {
+      console.error('Preprocessing worker stdin error:', error);
+    });
+  }
+
+  /** Fail everything waiting on this worker and let the next call start a new one */
+  private shutdown(error: Error) {
+    if (this.exited) return;
+    this.exited = true;
+    if (this.timer) clearTimeout(this.timer);
+    this.markFailed(error);
+    this.pending.forEach((request) => request.reject(error));
+    this.pending.clear();
+    this.onExit();
+  }
+
+  /** Time the request the worker is currently handling, the oldest pending one */
+  private armTimer() {
+    if (this.timer) clearTimeout(this.timer);
+    this.timer = null;
+    const head = this.pending.entries().next().value as [number, PendingRequest] | undefined;
+    if (!head) return;
+    this.timer = setTimeout(() => this.timeout(head[0]), REQUEST_TIMEOUT_MS);
+  }
+
+  private timeout(id: number) {
+    const request = this.pending.get(id);
+    if (!request) return;
+    this.pending.delete(id);
+    console.error(`Preprocessing request ${id} timed out after ${REQUEST_TIMEOUT_MS}ms, restarting worker`);
+    request.reject(new Error(`Preprocessing timed out after ${REQUEST_TIMEOUT_MS}ms`));
+
+    // Hand the queued requests to a fresh worker before killing this one
+    const queued = Array.from(this.pending.values());
+    this.pending.clear();
+    this.shutdown(new Error('Preprocessing worker restarted'));
+    this.process.kill('SIGKILL');
+    queued.forEach((queuedRequest) => {
+      getPreprocessWorker()
+        .request(queuedRequest.payload, queuedRequest.onStatus)
+        .then(queuedRequest.resolve, queuedRequest.reject);
+    });
+  }
+
+  private handleMessage(line: string, markReady: () => void) {
+    let message: any;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.error('Failed to parse preprocessing worker output:', line);
+      return;
+    }
+
+    if (message.type === 'ready') {
+      console.log('Preprocessing worker ready, pid:', message.pid);
+      markReady();
+      return;
+    }
+
+    const request = this.pending.get(message.id);
+    if (!request) return;
+    this.pending.delete(message.id);
+    this.armTimer();
+
+    if (message.ok) {
+      request.resolve(message.result);
+    } else {
+      request.reject(new Error(`Preprocessing failed: ${message.error}`));
+    }
+  }
+
+  async request(payload: Record<string, unknown>, onStatus: (step: string) => void = () => undefined): Promise<any> {
+    await this.ready;
+    if (this.exited) {
+      throw new Error('Preprocessing worker is not running');
+    }
+
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { payload, resolve, reject, onStatus });
+      if (this.pending.size === 1) this.armTimer();
+      this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+  }
+}
+
+let worker: PreprocessWorker | null = null;
+
+function getPreprocessWorker(): PreprocessWorker {
+  if (!worker) {
+    const current = new PreprocessWorker(() => {
+      if (worker === current) worker = null;
+    });
+    worker = current;
+  }
+  return worker;
+}
+
+export async function checkPreprocessWorkerHealth(): Promise<any> {
+  return getPreprocessWorker().request({ method: 'health' });
+}
+
 export async function preprocessData(transcript: string, onStatus: (step: string) => void): Promise<any> {
+  // Set PREPROCESS_WORKER=0 to fall back to one Python process per transcript
+  if (process.env.PREPROCESS_WORKER === '0') {
+    return preprocessDataOnce(transcript, onStatus);
+  }
+  return getPreprocessWorker().request({ text: cleanTranscript(transcript) }, onStatus);
+}
+
+export async function preprocessDataOnce(transcript: string, onStatus: (step: string) => void): Promise<any> {
   return new Promise((resolve, reject) => {
     const scriptPath = path.join(process.cwd(), 'scripts', 'smart_preprocess.py');
     console.log('Running Python script:', scriptPath);
     
-    // Use python3 or python depending on system
-    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
-    const pythonProcess = spawn(pythonCommand, [scriptPath], {
+    const pythonProcess = spawn(getPythonCommand(), [scriptPath], {
       stdio: ['pipe', 'pipe', 'pipe'],
       env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
     });
@@ -82,21 +295,8 @@ export async function preprocessData(transcript: string, onStatus: (step: string
       });
     });
 
-    // Clean up HTML entities and common transcription errors
-    const cleanTranscript = transcript
-      .replace(/&amp;/g, '&')
-      .replace(/&lt;/g, '<')
-      .replace(/&gt;/g, '>')
-      .replace(/&quot;/g, '"')
-      .replace(/&#39;/g, "'")
-      .replace(/&nbsp;/g, ' ')
-      // Fix common transcription errors
-      .replace(/\bNN\b/g, 'n8n')
-      .replace(/\bnadn\b/gi, 'n8n')
-      .replace(/\bn a d n\b/gi, 'n8n');
-
     // Send cleaned transcript
-    pythonProcess.stdin.write(cleanTranscript);
+    pythonProcess.stdin.write(cleanTranscript(transcript));
     pythonProcess.stdin.end();
 
     pythonProcess.on('close', (code) => {
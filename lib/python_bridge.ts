@@ -0,0 +1,41 @@
+import { createInterface } from 'readline';
+import { validateEnrichment } from './video_validation';
+import { VideoType } from '@/types/openai';
+
+// Long-lived JSON-RPC endpoint for scripts/video_analysis.py.
+// Reads one request per line on stdin: {"id": 1, "method": "video_validation", "params": {...}}
+// and writes one response per line on stdout: {"id": 1, "result": ...} or {"id": 1, "error": "..."}
+
+type Handler = (params: any) => unknown;
+
+const handlers: Record<string, Handler> = {
+  video_validation: ({ content, type }) => validateEnrichment(type as VideoType, content)
+};
+
+function respond(message: Record<string, unknown>) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+const input = createInterface({ input: process.stdin });
+
+input.on('line', async (line) => {
+  if (!line.trim()) return;
+  let id: unknown = null;
+  try {
+    const request = JSON.parse(line);
+    id = request.id;
+    const handler = handlers[request.method];
+    if (!handler) {
+      respond({ id, error: `Unknown method: ${request.method}` });
+      return;
+    }
+    respond({ id, result: await handler(request.params ?? {}) });
+  } catch (error) {
+    respond({ id, error: error instanceof Error ? error.message : String(error) });
+  }
+});
+
+input.on('close', () => process.exit(0));
+
+// Tell the Python side the modules are loaded and requests can be sent
+respond({ id: null, ready: true });
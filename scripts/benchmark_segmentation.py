@@ -0,0 +1,110 @@
+"""Compare the spaCy sentence-splitting modes available to SmartPreprocessor.
+
+For every mode in smart_preprocess.NLP_MODES this reports model load time,
+parse speed and how closely its sentence boundaries agree with the first mode
+that loaded (the full en_core_web_sm pipeline by default).
+
+    python scripts/benchmark_segmentation.py [transcripts...] [--modes full parser sentencizer]
+
+Transcripts can be .txt/.json files, directories of them, or JSONL files as
+accepted by ``smart_preprocess.py --batch``; test_data/raw_transcript.json is
+used when none are given.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+from smart_preprocess import NLP_MODES, load_nlp, read_batch_input, _transcript_text
+
+DEFAULT_TRANSCRIPT = Path(__file__).resolve().parent.parent / 'test_data' / 'raw_transcript.json'
+
+def load_transcripts(paths: List[str]) -> List[str]:
+    texts = []
+    for path in paths or [str(DEFAULT_TRANSCRIPT)]:
+        source = Path(path)
+        if source.suffix == '.txt':
+            texts.append(source.read_text(encoding='utf-8'))
+        elif source.suffix == '.json':
+            with open(source, encoding='utf-8') as f:
+                texts.append(_transcript_text(json.load(f)))
+        else:
+            texts.extend(text for _, text in read_batch_input(path))
+    return [text for text in texts if text.strip()]
+
+def sentence_boundaries(doc) -> Set[int]:
+    """Character offsets where a sentence ends, excluding the end of the text"""
+    return {sent.end_char for sent in doc.sents if sent.end_char < len(doc.text)}
+
+def boundary_scores(predicted: List[Set[int]], reference: List[Set[int]]) -> Dict[str, float]:
+    matched = sum(len(p & r) for p, r in zip(predicted, reference))
+    predicted_total = sum(len(p) for p in predicted)
+    reference_total = sum(len(r) for r in reference)
+    precision = matched / predicted_total if predicted_total else 1.0
+    recall = matched / reference_total if reference_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': precision, 'recall': recall, 'f1': f1}
+
+def benchmark(texts: List[str], modes: List[str], repeat: int = 3) -> List[Dict]:
+    results = []
+    reference = None
+    total_chars = sum(len(text) for text in texts)
+
+    for mode in modes:
+        print(f"Benchmarking {mode}...", file=sys.stderr)
+        started = time.perf_counter()
+        try:
+            nlp = load_nlp(mode)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {mode}: {e}", file=sys.stderr)
+            continue
+        load_seconds = time.perf_counter() - started
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            docs = list(nlp.pipe(texts))
+            timings.append(time.perf_counter() - started)
+        parse_seconds = min(timings)
+
+        boundaries = [sentence_boundaries(doc) for doc in docs]
+        if reference is None:
+            reference = (mode, boundaries)
+
+        results.append({
+            'mode': mode,
+            'pipeline': nlp.pipe_names,
+            'load_seconds': load_seconds,
+            'parse_ms_per_doc': parse_seconds * 1000 / len(texts),
+            'chars_per_second': total_chars / parse_seconds if parse_seconds else 0.0,
+            'sentences': sum(len(b) + 1 for b in boundaries),
+            'reference': reference[0],
+            **boundary_scores(boundaries, reference[1])
+        })
+    return results
+
+def print_report(results: List[Dict], texts: List[str]):
+    print(f"# Segmentation benchmark ({len(texts)} transcripts, {sum(len(t) for t in texts):,} chars)\n")
+    print("| Mode | Pipeline | Load (s) | Parse (ms/doc) | Chars/s | Sentences | Precision | Recall | F1 |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    for r in results:
+        print(f"| {r['mode']} | {', '.join(r['pipeline']) or '-'} | {r['load_seconds']:.2f} | "
+              f"{r['parse_ms_per_doc']:.1f} | {r['chars_per_second']:,.0f} | {r['sentences']} | "
+              f"{r['precision']:.3f} | {r['recall']:.3f} | {r['f1']:.3f} |")
+    if results:
+        print(f"\nBoundary scores are measured against the {results[0]['reference']} mode.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark SmartPreprocessor sentence splitting modes')
+    parser.add_argument('transcripts', nargs='*', help='Transcript files, directories or JSONL files')
+    parser.add_argument('--modes', nargs='+', choices=NLP_MODES, default=list(NLP_MODES))
+    parser.add_argument('--repeat', type=int, default=3, help='Parse runs per mode; the fastest is reported')
+    args = parser.parse_args()
+
+    texts = load_transcripts(args.transcripts)
+    if not texts:
+        print("No transcripts to benchmark", file=sys.stderr)
+        sys.exit(1)
+    print_report(benchmark(texts, args.modes, args.repeat), texts)
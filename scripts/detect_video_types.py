@@ -0,0 +1,53 @@
+"""Classify many videos with pattern-based detection.
+
+Reads video metadata as JSONL (VideoMetadata or stored YouTube records such
+as data/video_meta_<id>.json, one per line) and writes one JSON line per
+video, in input order:
+
+    {"videoId": "...", "detection": {"type": ..., "confidence": ..., ...}}
+
+    python scripts/detect_video_types.py catalog.jsonl --output detections.jsonl
+    cat catalog.jsonl | python scripts/detect_video_types.py - --workers 8
+"""
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+from video_analysis.detection import detect_video_type, map_chunks
+from video_analysis.types import to_video_metadata
+
+def detect_lines(lines: List[str]) -> List[str]:
+    """Output lines for a chunk of input lines; parsing happens in the workers too"""
+    results = []
+    for line in lines:
+        metadata = to_video_metadata(json.loads(line))
+        results.append(json.dumps({'videoId': metadata['videoId'], 'detection': detect_video_type(metadata)}) + '\n')
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Detect video types for a JSONL file of video metadata')
+    parser.add_argument('input', help="JSONL metadata file, or '-' for stdin")
+    parser.add_argument('--output', help='Output JSONL file (default: stdout)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Videos sent to a worker at a time')
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.perf_counter()
+    count = 0
+    try:
+        lines = (line for line in source if line.strip())
+        for result in map_chunks(detect_lines, lines, args.workers, args.chunk_size):
+            out.write(result)
+            count += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Classified {count} videos in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s)", file=sys.stderr)
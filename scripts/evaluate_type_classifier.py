@@ -0,0 +1,120 @@
+"""Offline evaluation of video type detection against stored analyses.
+
+Labels come from the video type recorded in data/video_analysis_*.json and
+data/analysis/video_analysis_*.json; metadata from the analysis file itself
+or data/video_meta_<id>.json. For pattern detection, the embedding classifier
+and their combination this reports accuracy and how many videos would still
+be escalated to verify_video_type.
+
+    python scripts/evaluate_type_classifier.py [--min-margin 0.04 0.08 0.12]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from video_analysis.detection import detect_video_type
+from video_analysis.embedding_classifier import EmbeddingClassifier, refine_detection, DEFAULT_MIN_MARGIN
+from video_analysis.types import VideoType, VideoMetadata, to_video_metadata
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+# Labels used by older analyses that map onto a VideoType
+LABEL_ALIASES = {'recipe': 'howto'}
+
+def _label(record: Dict) -> Optional[str]:
+    analysis = record.get('analysis') if isinstance(record.get('analysis'), dict) else {}
+    label = analysis.get('video_type') or analysis.get('type') or record.get('video_type')
+    if not isinstance(label, str):
+        return None
+    label = label.strip().lower()
+    return LABEL_ALIASES.get(label, label)
+
+def load_examples(data_dir: Path) -> Tuple[List[Tuple[VideoMetadata, VideoType]], List[str]]:
+    """Labelled (metadata, type) pairs, one per video, plus a note for every analysis that was skipped"""
+    examples, skipped = [], []
+    paths = sorted(data_dir.glob('video_analysis_*.json')) + sorted(data_dir.glob('analysis/video_analysis_*.json'))
+
+    # A video can have an analysis in both directories; only label it when they agree
+    records: Dict[str, List[Dict]] = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            records.setdefault(path.stem[len('video_analysis_'):], []).append(json.load(f))
+
+    for video_id, video_records in records.items():
+        labels = {_label(record) for record in video_records}
+        if len(labels) > 1:
+            skipped.append(f"{video_id}: conflicting labels {', '.join(sorted(map(str, labels)))}")
+            continue
+        label = labels.pop()
+        if label not in {str(t) for t in VideoType}:
+            skipped.append(f"{video_id}: label {label!r} is not a VideoType")
+            continue
+
+        # Prefer the analysis that carries the video's metadata
+        record = next((r for r in video_records if isinstance(r.get('metadata'), dict) and r['metadata'].get('title')),
+                      video_records[0])
+        meta_path = data_dir / f'video_meta_{video_id}.json'
+        if meta_path.exists():
+            with open(meta_path, encoding='utf-8') as f:
+                raw = json.load(f)
+        elif isinstance(record.get('metadata'), dict) and record['metadata'].get('title'):
+            raw = record['metadata']
+        elif record.get('title'):
+            raw = {**record, **(record.get('metadata') or {})}
+        else:
+            skipped.append(f"{video_id}: no metadata")
+            continue
+        metadata = to_video_metadata({'videoId': video_id, **raw})
+        examples.append((metadata, VideoType(label)))
+    return examples, skipped
+
+def evaluate(examples: List[Tuple[VideoMetadata, VideoType]], classifier: EmbeddingClassifier,
+             margins: List[float]) -> List[Dict]:
+    detections = [detect_video_type(metadata) for metadata, _ in examples]
+    classifications = classifier.classify_many([metadata for metadata, _ in examples])
+    labels = [label for _, label in examples]
+
+    def row(name: str, results: List[Dict]) -> Dict:
+        settled = [r['type'] == label for r, label in zip(results, labels) if not r.get('needsAIVerification')]
+        return {
+            'method': name,
+            'accuracy': sum(r['type'] == label for r, label in zip(results, labels)) / len(labels),
+            'escalated': 1 - len(settled) / len(labels),
+            'settled_accuracy': sum(settled) / len(settled) if settled else None
+        }
+
+    rows = [
+        row('patterns', detections),
+        row('embedding', [{**c, 'needsAIVerification': False} for c in classifications])
+    ]
+    for margin in margins:
+        refined = [refine_detection(d, c, margin) for d, c in zip(detections, classifications)]
+        rows.append(row(f'combined (margin {margin:g})', refined))
+    return rows
+
+def print_report(rows: List[Dict], examples: List, skipped: List[str]):
+    print(f"# Video type detection ({len(examples)} labelled videos)\n")
+    print("| Method | Accuracy | Escalated to API | Accuracy without API |")
+    print("|---|---|---|---|")
+    for r in rows:
+        settled = f"{r['settled_accuracy']:.1%}" if r['settled_accuracy'] is not None else '-'
+        print(f"| {r['method']} | {r['accuracy']:.1%} | {r['escalated']:.1%} | {settled} |")
+    if skipped:
+        print(f"\nSkipped {len(skipped)} analyses:")
+        for note in skipped:
+            print(f"- {note}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Evaluate video type detection against stored analyses')
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--min-margin', type=float, nargs='+', default=[DEFAULT_MIN_MARGIN],
+                        help='Embedding margins at which a video is settled without the API')
+    args = parser.parse_args()
+
+    examples, skipped = load_examples(Path(args.data_dir))
+    if not examples:
+        print("No labelled videos found", file=sys.stderr)
+        sys.exit(1)
+    print_report(evaluate(examples, EmbeddingClassifier(), args.min_margin), examples, skipped)
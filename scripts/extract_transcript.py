@@ -1,49 +1,64 @@
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+from youtube_transcript_api import TranscriptsDisabled, NoTranscriptFound
 import json
 import sys
 
-def extract_transcript(video_id):
-    try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        
-        # Format the transcript with timestamps
-        formatted_transcript = []
-        for entry in transcript_list:
-            start_time = entry['start']
-            text = entry['text']
-            minutes = int(start_time // 60)
-            seconds = int(start_time % 60)
-            timestamp = f"[{minutes}:{seconds:02d}]"
-            formatted_transcript.append(f"{timestamp} {text}")
-        
-        # Join all lines with newlines
-        full_transcript = "\n".join(formatted_transcript)
-        
-        # Save to file
-        output_file = f"transcript_{video_id}.txt"
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(full_transcript)
-            
-        print(f"Successfully extracted transcript and saved to {output_file}")
-        return full_transcript
-        
-    except TranscriptsDisabled:
+from transcript_fetcher import get_transcript_fetcher
+
+def save_transcript(video_id, transcript_list):
+    # Format the transcript with timestamps
+    formatted_transcript = []
+    for entry in transcript_list:
+        start_time = entry['start']
+        text = entry['text']
+        minutes = int(start_time // 60)
+        seconds = int(start_time % 60)
+        timestamp = f"[{minutes}:{seconds:02d}]"
+        formatted_transcript.append(f"{timestamp} {text}")
+
+    # Join all lines with newlines
+    full_transcript = "\n".join(formatted_transcript)
+
+    # Save to file
+    output_file = f"transcript_{video_id}.txt"
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(full_transcript)
+
+    print(f"Successfully extracted transcript and saved to {output_file}")
+    return full_transcript
+
+def report_error(video_id, error):
+    if isinstance(error, TranscriptsDisabled):
         print(f"Error: Transcripts are disabled for video {video_id}")
-        return None
-    except NoTranscriptFound:
+    elif isinstance(error, NoTranscriptFound):
         print(f"Error: No transcript found for video {video_id}")
-        return None
+    else:
+        print(f"Error extracting transcript: {str(error)}")
+
+def extract_transcript(video_id):
+    try:
+        transcript = get_transcript_fetcher().get(video_id)
     except Exception as e:
-        print(f"Error extracting transcript: {str(e)}")
+        report_error(video_id, e)
         return None
+    return save_transcript(video_id, transcript['segments'])
+
+def extract_transcripts(video_ids):
+    """Fetch many transcripts concurrently; returns {video_id: transcript text or None}"""
+    transcripts = {}
+    for video_id, result in get_transcript_fetcher().fetch_many(video_ids):
+        if isinstance(result, Exception):
+            report_error(video_id, result)
+            transcripts[video_id] = None
+        else:
+            transcripts[video_id] = save_transcript(video_id, result['segments'])
+    return transcripts
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python extract_transcript.py <video_id>")
+    if len(sys.argv) < 2:
+        print("Usage: python extract_transcript.py <video_id> [<video_id> ...]")
         sys.exit(1)
-        
-    video_id = sys.argv[1]
-    transcript = extract_transcript(video_id)
-    
-    if transcript is None:
+
+    transcripts = extract_transcripts(dict.fromkeys(sys.argv[1:]))
+
+    if any(transcript is None for transcript in transcripts.values()):
         sys.exit(1)
@@ -0,0 +1,206 @@
+"""On-disk caches for smart_preprocess.py."""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from video_analysis.cache import SqliteCache
+
+# Shared by every cache in this module unless PREPROCESS_CACHE_DIR is set
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'cache' / 'preprocess'
+
+def get_cache_dir() -> Path:
+    return Path(os.getenv('PREPROCESS_CACHE_DIR', DEFAULT_CACHE_DIR))
+
+def fingerprint(value) -> str:
+    """Stable sha256 of any JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+class ResultCache(SqliteCache):
+    """Content-addressed store of preprocessing results with LRU eviction.
+
+    Entries are keyed by a hash of the transcript together with everything
+    that affects the output (model names, pattern set, scoring options), so a
+    change to any of them simply stops old entries from matching; they are
+    evicted once the cache grows past ``max_entries`` or ``max_bytes``.
+    """
+    table = 'results'
+    eviction_message = "🗑️ Evicted {} cached preprocessing results"
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(path or get_cache_dir() / 'results.sqlite', max_entries, max_bytes)
+
+    @staticmethod
+    def make_key(text: str, config: Dict) -> str:
+        return fingerprint({'text': text, 'config': config})
+
+class EmbeddingCache:
+    """Sentence embeddings shared between processes through a memory-mapped matrix.
+
+    Vectors live in ``vectors.f32``, a float32 matrix mapped with np.memmap so
+    every worker reads the same pages, and ``index.sqlite`` maps normalized
+    sentence text to a row plus its last use. The index uses sqlite's default
+    rollback journal on purpose: a lookup holds a shared lock while it copies
+    rows, so compaction (which needs an exclusive lock) never moves rows under
+    a reader. When more than ``max_rows`` sentences are stored, the least
+    recently used ones are dropped and the rest are packed to the front of the
+    file in place.
+    """
+    def __init__(self, model_name: str, path: Optional[Path] = None, max_rows: int = 200000,
+                 compact_ratio: float = 0.75, grow_rows: int = 4096):
+        self.dir = Path(path) if path else get_cache_dir() / 'embeddings' / model_name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.dir / 'vectors.f32'
+        self.max_rows = max_rows
+        self.compact_ratio = compact_ratio
+        self.grow_rows = grow_rows
+        self._vectors = None
+        self._db = sqlite3.connect(str(self.dir / 'index.sqlite'), timeout=60,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sentences ('
+            'key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS sentences_last_used ON sentences (last_used)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.vectors_path.touch(exist_ok=True)
+
+    @staticmethod
+    def key(sentence: str) -> str:
+        return hashlib.sha1(' '.join(sentence.split()).encode('utf-8')).hexdigest()
+
+    def _meta(self, name: str) -> Optional[int]:
+        row = self._db.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value: int):
+        self._db.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, value))
+
+    def _map(self, dim: int, rows_needed: int = 0):
+        """Map the vector file, remapping when another process has grown it"""
+        import numpy as np
+        if self._vectors is not None and self._vectors.shape[0] >= rows_needed:
+            return self._vectors
+        rows = os.path.getsize(self.vectors_path) // (dim * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(rows, dim)) if rows else None
+        return self._vectors
+
+    def lookup(self, sentences) -> Dict:
+        """Cached vectors for the given sentences, keyed by EmbeddingCache.key"""
+        keys = list({self.key(sentence) for sentence in sentences})
+        found = {}
+        self._db.execute('BEGIN')
+        try:
+            dim = self._meta('dim')
+            if dim is None:
+                return found
+            rows = []
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows.extend(self._db.execute(
+                    f"SELECT key, row FROM sentences WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            if rows:
+                vectors = self._map(dim, max(row for _, row in rows) + 1)
+                for key, row in rows:
+                    found[key] = vectors[row].copy()
+        finally:
+            self._db.execute('COMMIT')
+
+        if found:
+            self._db.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            self._db.executemany('UPDATE sentences SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+            self._db.execute('COMMIT')
+        return found
+
+    def store(self, sentences, vectors):
+        """Append vectors for sentences that are not cached yet"""
+        import numpy as np
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            dim = self._meta('dim')
+            if dim is None:
+                dim = vectors.shape[1]
+                self._set_meta('dim', dim)
+            next_row = self._meta('next_row') or 0
+
+            new = {}
+            for sentence, vector in zip(sentences, vectors):
+                key = self.key(sentence)
+                if key not in new and self._db.execute('SELECT 1 FROM sentences WHERE key = ?', (key,)).fetchone() is None:
+                    new[key] = vector
+            if not new:
+                return
+
+            # Grow the file in steps; existing mappings in other processes stay valid
+            rows_needed = next_row + len(new)
+            capacity = os.path.getsize(self.vectors_path) // (dim * 4)
+            if rows_needed > capacity:
+                with open(self.vectors_path, 'r+b') as f:
+                    f.truncate((rows_needed + self.grow_rows) * dim * 4)
+            mapped = self._map(dim, rows_needed)
+            mapped[next_row:rows_needed] = np.stack(list(new.values()))
+            mapped.flush()
+
+            now = time.time()
+            self._db.executemany(
+                'INSERT INTO sentences (key, row, last_used) VALUES (?, ?, ?)',
+                [(key, next_row + offset, now) for offset, key in enumerate(new)]
+            )
+            self._set_meta('next_row', rows_needed)
+        finally:
+            self._db.execute('COMMIT')
+
+        if rows_needed > self.max_rows:
+            self.compact()
+
+    def compact(self):
+        """Keep the most recently used rows and pack them to the start of the file"""
+        keep = int(self.max_rows * self.compact_ratio)
+        self._db.execute('BEGIN EXCLUSIVE')
+        try:
+            dim = self._meta('dim')
+            kept = self._db.execute(
+                'SELECT key, row, last_used FROM sentences ORDER BY last_used DESC LIMIT ?', (keep,)
+            ).fetchall()
+            # Moving rows in ascending order never overwrites a row that is still to be copied
+            kept.sort(key=lambda entry: entry[1])
+            old_rows = [row for _, row, _ in kept]
+            if kept:
+                vectors = self._map(dim, max(old_rows) + 1)
+                for start in range(0, len(old_rows), 10000):
+                    chunk = old_rows[start:start + 10000]
+                    vectors[start:start + len(chunk)] = vectors[chunk]
+                vectors.flush()
+
+            self._db.execute('DELETE FROM sentences')
+            self._db.executemany('INSERT INTO sentences (key, row, last_used) VALUES (?, ?, ?)',
+                                 [(key, new_row, last_used) for new_row, (key, _, last_used) in enumerate(kept)])
+            self._set_meta('next_row', len(kept))
+        finally:
+            self._db.execute('COMMIT')
+        print(f"🗜️ Compacted sentence embedding cache to {len(kept)} rows", file=sys.stderr)
+
+    def encode(self, sentences, encode):
+        """Embed sentences, calling encode(list_of_sentences) only for unseen ones"""
+        import numpy as np
+        if not sentences:
+            return encode(sentences)
+
+        cached = self.lookup(sentences)
+        missing = list(dict.fromkeys(s for s in sentences if self.key(s) not in cached))
+        if missing:
+            vectors = encode(missing)
+            self.store(missing, vectors)
+            cached.update((self.key(sentence), vector) for sentence, vector in zip(missing, vectors))
+        return np.stack([cached[self.key(sentence)] for sentence in sentences]).astype(np.float32)
+
+    def close(self):
+        self._db.close()
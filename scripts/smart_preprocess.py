@@ -1,23 +1,343 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.cluster import AgglomerativeClustering
-import numpy as np
-from typing import List, Dict, Set, Tuple
+from __future__ import annotations
+
+from typing import List, Dict, Set, Tuple, Union, Optional, Callable, Iterable, Iterator, NamedTuple, FrozenSet, TYPE_CHECKING
 import re
+import heapq
 from pathlib import Path
 import json
-from youtube_transcript_api import YouTubeTranscriptApi
-import spacy
 import sys
-import subprocess
+import os
+import time
+import argparse
+from preprocess_cache import ResultCache, EmbeddingCache, fingerprint
+
+# numpy, spacy, sentence_transformers and youtube_transcript_api are imported
+# where they are first needed, so pattern-only runs and the CLI start quickly
+if TYPE_CHECKING:
+    import numpy as np
+
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+SPACY_MODEL_NAME = 'en_core_web_sm'
+# Stages SmartPreprocessor can run; a result always has all three sections
+STAGES = ('patterns', 'semantic', 'roles')
+# full: whole pipeline; parser: only what doc.sents needs (same sentences);
+# sentencizer: punctuation rules, fastest but needs punctuated text
+NLP_MODES = ('full', 'parser', 'sentencizer')
+# Bump when matching or scoring logic changes so cached results stop matching
+PATTERN_SET_VERSION = 1
+
+# Items kept per category in the output
+RESULT_LIMIT = 10
+# Window size for long transcripts, about 6000 tokens
+MAX_CHARS = 24000
+# Sentences carried between windows for context and problem-solution lookahead
+WINDOW_OVERLAP = 3
+
+def load_nlp(mode: str = 'parser'):
+    """Load a spaCy pipeline for sentence splitting in one of NLP_MODES"""
+    import spacy
+    if mode == 'full':
+        return spacy.load(SPACY_MODEL_NAME)
+    if mode == 'parser':
+        # The parser sets sentence boundaries; tagging, lemmas and entities are never used
+        return spacy.load(SPACY_MODEL_NAME, exclude=['tagger', 'attribute_ruler', 'lemmatizer', 'ner', 'senter'])
+    if mode == 'sentencizer':
+        nlp = spacy.blank('en')
+        nlp.add_pipe('sentencizer')
+        return nlp
+    raise ValueError(f"Unknown nlp mode: {mode} (expected one of {', '.join(NLP_MODES)})")
+
+class TopItems:
+    """Bounded heap of the highest-importance items, ties kept in arrival order"""
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._heap = []
+        self._count = 0
+
+    def add(self, item: Dict):
+        entry = (item.get('importance', 0), -self._count, item)
+        self._count += 1
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Dict]:
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+def compute_centrality(embeddings: np.ndarray, top_k: Optional[int] = None,
+                       max_anchors: Optional[int] = None, block_size: int = 1024,
+                       reference: Optional[np.ndarray] = None) -> np.ndarray:
+    """Centrality of every sentence from normalized embeddings.
+
+    By default this is the mean similarity of each sentence to all sentences,
+    which equals ``embeddings @ mean(embeddings)`` and costs a single
+    matrix-vector product. With ``top_k`` each sentence is scored by its k most
+    similar sentences instead, computed block by block; ``max_anchors`` limits
+    the comparison to evenly spaced sentences to approximate it on very long
+    transcripts. ``reference`` replaces the document mean, e.g. with the mean
+    of a whole transcript that is processed window by window.
+    """
+    import numpy as np
+    if len(embeddings) == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    if not top_k:
+        return embeddings @ (embeddings.mean(axis=0) if reference is None else reference)
+
+    anchors = embeddings
+    if max_anchors and len(embeddings) > max_anchors:
+        anchors = embeddings[np.linspace(0, len(embeddings) - 1, max_anchors).astype(int)]
+    k = min(top_k, len(anchors))
+
+    scores = np.empty(len(embeddings), dtype=np.float32)
+    for start in range(0, len(embeddings), block_size):
+        similarities = embeddings[start:start + block_size] @ anchors.T
+        nearest = np.partition(similarities, -k, axis=1)[:, -k:]
+        scores[start:start + block_size] = nearest.mean(axis=1)
+    return scores
+
+class SentenceMatches(NamedTuple):
+    categories: FrozenSet[str]
+    keywords: FrozenSet[str]
+
+class PatternEngine:
+    """All sentence-level patterns compiled into a single scanner.
+
+    Keyword lists and every branch of a ``(?i)`` pattern that is plain text
+    (``important|key|note``, ``you (need|must)``) are merged into one trie and
+    rendered as a factored regex, so a position costs a single character
+    branch. The trie and the remaining real regexes (``step\\s+\\d+``, list
+    markers, code spans) form one lookahead alternation over the lowercased
+    sentence that finds every position where anything can start. At those
+    few positions a walk down the trie collects all entries starting there
+    (``import`` and ``important`` alike) and, only if a regex fired, one match
+    of named lookahead groups reports which. Each category therefore behaves
+    exactly like its own ``re.search`` or substring test. Patterns without
+    ``(?i)`` are case-sensitive and get a second scanner over the original
+    sentence.
+    """
+    _END = ''
+
+    def __init__(self, patterns: Dict[str, str], action_patterns: List[str],
+                 semantic_keywords: Dict[str, List[str]], role_patterns: Dict[str, List[str]]):
+        # Trie of lowercase literals; the '' key holds (category, role keyword or None) entries
+        self._trie: Dict = {}
+        folded = []  # (category, regex) matched case-insensitively on the lowercased sentence
+        cased = []   # (category, regex) matched on the original sentence
+        
+        for category, pattern in [*patterns.items(), *(('actions', pattern) for pattern in action_patterns)]:
+            if not pattern.startswith('(?i)'):
+                cased.append((category, pattern))
+                continue
+            for branch in self._branches(pattern[len('(?i)'):]):
+                literals = self._literals(branch)
+                if literals is None:
+                    folded.append((category, f'(?i:{branch})'))
+                for literal in literals or ():
+                    self._add_literal(literal, (category, None))
+        for group, words in semantic_keywords.items():
+            for word in words:
+                self._add_literal(word, (group, None))
+        for role, words in role_patterns.items():
+            for word in words:
+                self._add_literal(word, (role, word))
+        
+        alternatives = []
+        if folded:
+            alternatives.append(f'(?P<regex>{self._union(folded)})')
+        if self._trie:
+            alternatives.append(f'(?P<keyword>{self._trie_regex(self._trie)})')
+        self._starts = re.compile('(?=' + '|'.join(alternatives) + ')') if alternatives else None
+        self._at, self._at_groups = self._group_matcher(folded)
+        self._cased_starts = re.compile(f'(?={self._union(cased)})') if cased else None
+        self._cased_at, self._cased_groups = self._group_matcher(cased)
+
+    @staticmethod
+    def _union(entries: List[Tuple[str, str]]) -> str:
+        return '|'.join(f'(?:{source})' for _, source in entries)
+
+    @staticmethod
+    def _group_matcher(entries: List[Tuple[str, str]]):
+        """One regex whose named lookahead groups report every entry matching at a position"""
+        matcher = re.compile(''.join(f'(?:(?=(?P<g{i}>{source}))|)' for i, (_, source) in enumerate(entries)))
+        return matcher, {f'g{i}': category for i, (category, _) in enumerate(entries)}
+
+    @staticmethod
+    def _branches(source: str) -> List[str]:
+        """Top-level alternatives of a pattern, looking through one enclosing group"""
+        depth = 0
+        in_class = False
+        splits = []
+        close_of_first = None
+        i = 0
+        while i < len(source):
+            char = source[i]
+            if char == '\\':
+                i += 2
+                continue
+            if in_class:
+                in_class = char != ']'
+            elif char == '[':
+                in_class = True
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth == 0 and close_of_first is None:
+                    close_of_first = i
+            elif char == '|' and depth == 0:
+                splits.append(i)
+            i += 1
+        
+        if not splits and source.startswith('(') and not source.startswith('(?') and close_of_first == len(source) - 1:
+            return PatternEngine._branches(source[1:-1])
+        bounds = [-1, *splits, len(source)]
+        return [source[start + 1:end] for start, end in zip(bounds, bounds[1:])]
+
+    @staticmethod
+    def _literals(source: str) -> Optional[List[str]]:
+        """Every string a pattern of plain text, groups and | can match, or None"""
+        def alternation(i: int):
+            options = []
+            while True:
+                sequence, i = concatenation(i)
+                if sequence is None:
+                    return None, i
+                options.extend(sequence)
+                if i < len(source) and source[i] == '|':
+                    i += 1
+                    continue
+                return options, i
+        
+        def concatenation(i: int):
+            results = ['']
+            while i < len(source) and source[i] not in '|)':
+                char = source[i]
+                if char == '(' and not source.startswith('(?', i):
+                    inner, i = alternation(i + 1)
+                    if inner is None or i >= len(source) or source[i] != ')':
+                        return None, i
+                    results = [result + option for result in results for option in inner]
+                    i += 1
+                elif char == '\\' and i + 1 < len(source) and not source[i + 1].isalnum():
+                    results = [result + source[i + 1] for result in results]
+                    i += 2
+                elif char in '\\.^$*+?{}[]()':
+                    return None, i
+                else:
+                    results = [result + char for result in results]
+                    i += 1
+            return results, i
+        
+        literals, end = alternation(0)
+        if literals is None or end != len(source) or not all(literals):
+            return None
+        return [literal.lower() for literal in literals]
+
+    def _add_literal(self, word: str, entry: Tuple[str, Optional[str]]):
+        node = self._trie
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        node.setdefault(self._END, []).append(entry)
+
+    def _trie_regex(self, node: Dict) -> str:
+        branches = [re.escape(char) + self._trie_regex(child) for char, child in node.items() if char != self._END]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A literal ending here makes the rest optional, so shorter literals still match
+        return f'(?:{body})?' if self._END in node else body
+
+    def scan(self, sentence: str) -> SentenceMatches:
+        categories = set()
+        keywords = set()
+        lowered = sentence.lower()
+        
+        for start in self._starts.finditer(lowered) if self._starts is not None else ():
+            position = start.start()
+            
+            # The keyword branch only wins the alternation when no regex matches here
+            if start.lastgroup == 'regex':
+                for group, value in self._at.match(lowered, position).groupdict().items():
+                    if value is not None:
+                        categories.add(self._at_groups[group])
+            
+            node = self._trie
+            for char in lowered[position:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                for category, keyword in node.get(self._END, ()):
+                    categories.add(category)
+                    if keyword is not None:
+                        keywords.add(keyword)
+        
+        if self._cased_starts is not None:
+            for start in self._cased_starts.finditer(sentence):
+                for group, value in self._cased_at.match(sentence, start.start()).groupdict().items():
+                    if value is not None:
+                        categories.add(self._cased_groups[group])
+        return SentenceMatches(frozenset(categories), frozenset(keywords))
+
+class AnalyzedDocument:
+    """A transcript parsed once and shared by every preprocessing stage.
+
+    Holds the spaCy doc and the stripped sentence list; the sentence
+    embeddings and their centrality scores are computed on first access and
+    reused afterwards.
+    """
+    def __init__(self, text: str, doc, encode: Callable[[List[str]], np.ndarray],
+                 centrality_top_k: Optional[int] = None, centrality_max_anchors: Optional[int] = None):
+        self.text = text
+        self.doc = doc
+        self.sentences = [sent.text.strip() for sent in doc.sents]
+        self._encode = encode
+        self._centrality_top_k = centrality_top_k
+        self._centrality_max_anchors = centrality_max_anchors
+        self._embeddings = None
+        self._centrality = None
+        # Optional mean embedding to score against instead of this document's own
+        self.reference = None
+        # Per-sentence PatternEngine hits, filled in by SmartPreprocessor
+        self.matches: Optional[List[SentenceMatches]] = None
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        if self._embeddings is None:
+            self._embeddings = self._encode(self.sentences)
+        return self._embeddings
+
+    @embeddings.setter
+    def embeddings(self, value: np.ndarray):
+        # Used when sentences of several documents are encoded together
+        self._embeddings = value
+        self._centrality = None
+
+    @property
+    def centrality(self) -> np.ndarray:
+        if self._centrality is None:
+            self._centrality = compute_centrality(
+                self.embeddings, self._centrality_top_k, self._centrality_max_anchors,
+                reference=self.reference
+            )
+        return self._centrality
 
 class SmartPreprocessor:
-    def __init__(self):
-        print("Initializing models...", file=sys.stderr)
-        # For semantic similarity
-        self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-        # For NLP tasks
-        print("Loading spaCy model...", file=sys.stderr)
-        self.nlp = spacy.load('en_core_web_sm')
+    def __init__(self, centrality_top_k: Optional[int] = None, centrality_max_anchors: Optional[int] = None,
+                 cache: Optional[ResultCache] = None, embedding_cache: Optional[EmbeddingCache] = None,
+                 nlp_mode: str = 'parser', stages: Iterable[str] = STAGES, score_roles: bool = True):
+        # Importance scoring: mean similarity by default, top-k neighbours if set
+        self.centrality_top_k = centrality_top_k
+        self.centrality_max_anchors = centrality_max_anchors
+        # Models are loaded on first use; see sentence_model and nlp
+        self.nlp_mode = nlp_mode
+        self._sentence_model = None
+        self._nlp = None
+        
+        # Stages to run; roles without scoring keep document order and need no embeddings
+        self.stages = tuple(stage for stage in STAGES if stage in set(stages))
+        self.score_roles = score_roles
         
         # Pattern definitions
         self.patterns = {
@@ -56,155 +376,411 @@ class SmartPreprocessor:
             r'(?i)(avoid|don\'t|never|always)'
         ]
         
-    def extract_patterns(self, text: str) -> Dict[str, List[Dict]]:
-        """Extract content based on patterns"""
-        doc = self.nlp(text)
-        sentences = [sent.text.strip() for sent in doc.sents]
+        # Keywords for problem-solution pairs and comparisons
+        self.semantic_keywords = {
+            'problems': ['problem', 'issue', 'error'],
+            'solutions': ['solution', 'fix', 'resolve'],
+            'comparisons': ['better', 'worse', 'unlike', 'compared']
+        }
         
-        results = {
-            'steps': [],
-            'examples': [],
-            'key_points': [],
-            'lists': [],
-            'code_blocks': []
+        # Every pattern and keyword above, compiled into one scanner
+        self.engine = PatternEngine(self.patterns, self.action_patterns, self.semantic_keywords, self.role_patterns)
+        
+        # Optional result cache, keyed on the transcript and everything that shapes the output
+        self.cache = cache
+        # Optional sentence-level cache so repeated sentences skip the model
+        self.embedding_cache = embedding_cache
+        self.cache_config = {
+            'version': PATTERN_SET_VERSION,
+            'models': [SENTENCE_MODEL_NAME, SPACY_MODEL_NAME, nlp_mode],
+            'patterns': fingerprint([self.patterns, self.role_patterns, self.action_patterns, self.semantic_keywords]),
+            'centrality': [centrality_top_k, centrality_max_anchors],
+            'limits': [RESULT_LIMIT, MAX_CHARS, WINDOW_OVERLAP],
+            'stages': [self.stages, score_roles]
         }
+
+    @property
+    def sentence_model(self):
+        """For semantic similarity, loaded the first time embeddings are needed"""
+        if self._sentence_model is None:
+            print("Initializing models...", file=sys.stderr)
+            from sentence_transformers import SentenceTransformer
+            self._sentence_model = SentenceTransformer(SENTENCE_MODEL_NAME)
+        return self._sentence_model
+
+    @property
+    def nlp(self):
+        """For sentence splitting, loaded the first time a text is analyzed"""
+        if self._nlp is None:
+            print(f"Loading spaCy model ({self.nlp_mode} mode)...", file=sys.stderr)
+            self._nlp = load_nlp(self.nlp_mode)
+        return self._nlp
+
+    @property
+    def needs_embeddings(self) -> bool:
+        return 'semantic' in self.stages or ('roles' in self.stages and self.score_roles)
+
+    def load_models(self):
+        """Load every model the configured stages use, e.g. before serving requests"""
+        self.nlp
+        if self.needs_embeddings:
+            self.sentence_model
         
-        # Track processed sentences to avoid duplicates
-        processed = set()
+    def encode(self, sentences: List[str], batch_size: int = 32) -> np.ndarray:
+        """Normalized sentence embeddings, only encoding sentences missing from the cache"""
+        def encode_with_model(batch: List[str]) -> np.ndarray:
+            return self.sentence_model.encode(batch, batch_size=batch_size, normalize_embeddings=True)
+        
+        if self.embedding_cache is None:
+            return encode_with_model(sentences)
+        return self.embedding_cache.encode(sentences, encode_with_model)
+
+    def analyze(self, text: str) -> AnalyzedDocument:
+        """Parse text once so all stages can share sentences and embeddings"""
+        return AnalyzedDocument(text, self.nlp(text), self.encode,
+                                self.centrality_top_k, self.centrality_max_anchors)
+
+    def analyze_many(self, texts: List[str], batch_size: int = 32, n_process: int = 1) -> List[AnalyzedDocument]:
+        """Parse texts with nlp.pipe and encode all of their sentences in one call"""
+        documents = [
+            AnalyzedDocument(text, doc, self.encode, self.centrality_top_k, self.centrality_max_anchors)
+            for text, doc in zip(texts, self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process))
+        ]
+        
+        if not self.needs_embeddings:
+            return documents
+        
+        sentences = [sentence for document in documents for sentence in document.sentences]
+        embeddings = self.encode(sentences, batch_size=batch_size)
+        
+        start = 0
+        for document in documents:
+            document.embeddings = embeddings[start:start + len(document.sentences)]
+            start += len(document.sentences)
+        return documents
+
+    def _as_document(self, text: Union[str, AnalyzedDocument]) -> AnalyzedDocument:
+        return text if isinstance(text, AnalyzedDocument) else self.analyze(text)
+
+    def _matches(self, document: AnalyzedDocument) -> List[SentenceMatches]:
+        """Scan every sentence once and share the hits between stages"""
+        if document.matches is None:
+            document.matches = [self.engine.scan(sentence) for sentence in document.sentences]
+        return document.matches
+
+    def _match_patterns(self, document: AnalyzedDocument, results: Dict[str, List[Dict]], processed: Set[str],
+                        start: int = 0, stop: Optional[int] = None, offset: int = 0, before: str = ""):
+        """Append pattern matches for sentences[start:stop] until each category holds RESULT_LIMIT items"""
+        sentences = document.sentences
+        matches = self._matches(document)
+        stop = len(sentences) if stop is None else stop
         
-        for i, sentence in enumerate(sentences):
+        for i in range(start, stop):
+            sentence = sentences[i]
             if sentence in processed:
                 continue
                 
             # Get context (previous and next sentences)
-            context_before = sentences[i-1] if i > 0 else ""
+            context_before = sentences[i-1] if i > 0 else before
             context_after = sentences[i+1] if i < len(sentences)-1 else ""
             
-            for pattern_type, pattern in self.patterns.items():
-                if re.search(pattern, sentence):
+            for pattern_type in self.patterns:
+                if len(results[pattern_type]) < RESULT_LIMIT and pattern_type in matches[i].categories:
                     results[pattern_type].append({
                         'content': sentence,
                         'context_before': context_before,
                         'context_after': context_after,
-                        'position': i
+                        'position': offset + i
                     })
                     processed.add(sentence)
+
+    def _match_semantic(self, document: AnalyzedDocument, add: Callable[[str, Dict], None],
+                        start: int = 0, stop: Optional[int] = None, before: str = ""):
+        """Report action, problem-solution and comparison items for sentences[start:stop]"""
+        sentences = document.sentences
+        matches = self._matches(document)
+        stop = len(sentences) if stop is None else stop
         
-        # Limit results to top 10 per category
-        for pattern_type in results:
-            results[pattern_type] = results[pattern_type][:10]
-        
-        print(f"📊 Stage 1: Extracting patterns and key points... Found {sum(len(v) for v in results.values())} pattern matches", file=sys.stderr)
-        return results
-    
-    def semantic_analysis(self, text: str) -> Dict[str, List[Dict]]:
-        """Analyze text for semantic patterns"""
-        doc = self.nlp(text)
-        sentences = [sent.text.strip() for sent in doc.sents]
-        
-        results = {
-            'actions': [],
-            'problems': [],
-            'comparisons': []
-        }
-        
-        # Encode all sentences for similarity comparison
-        embeddings = self.sentence_model.encode(sentences)
+        # Centrality is computed once for all sentences and shared with the other stages
+        centrality = document.centrality
         
-        for i, sentence in enumerate(sentences):
+        for i in range(start, stop):
+            sentence = sentences[i]
+            categories = matches[i].categories
+            
             # Find action items
-            if any(re.search(pattern, sentence) for pattern in self.action_patterns):
-                results['actions'].append({
+            if 'actions' in categories:
+                add('actions', {
                     'content': sentence,
-                    'importance': self._calculate_importance(embeddings[i], embeddings)
+                    'importance': float(centrality[i])
                 })
             
             # Find problem-solution pairs
-            if any(word in sentence.lower() for word in ['problem', 'issue', 'error']):
+            if 'problems' in categories:
                 # Look for solution in next few sentences
                 for j in range(i+1, min(i+4, len(sentences))):
-                    if any(word in sentences[j].lower() for word in ['solution', 'fix', 'resolve']):
-                        results['problems'].append({
+                    if 'solutions' in matches[j].categories:
+                        add('problems', {
                             'problem': sentence,
                             'solution': sentences[j],
-                            'importance': self._calculate_importance(embeddings[i], embeddings)
+                            'importance': float(centrality[i])
                         })
                         break
             
             # Find comparisons
-            if any(word in sentence.lower() for word in ['better', 'worse', 'unlike', 'compared']):
-                results['comparisons'].append({
+            if 'comparisons' in categories:
+                add('comparisons', {
                     'content': sentence,
-                    'context': sentences[i-1] if i > 0 else "",
-                    'importance': self._calculate_importance(embeddings[i], embeddings)
+                    'context': sentences[i-1] if i > 0 else before,
+                    'importance': float(centrality[i])
                 })
+
+    def _match_roles(self, document: AnalyzedDocument, add: Callable[[str, Dict], None],
+                     start: int = 0, stop: Optional[int] = None):
+        """Report role-related items for sentences[start:stop]"""
+        sentences = document.sentences
+        matches = self._matches(document)
+        stop = len(sentences) if stop is None else stop
+        
+        # Centrality is computed once for all sentences and shared with the other stages
+        centrality = document.centrality if self.score_roles else None
+        
+        for i in range(start, stop):
+            if not matches[i].keywords:
+                continue
+            for role, patterns in self.role_patterns.items():
+                if role in matches[i].categories:
+                    item = {
+                        'content': sentences[i],
+                        'matched_patterns': [p for p in patterns if p in matches[i].keywords]
+                    }
+                    if centrality is not None:
+                        item['importance'] = float(centrality[i])
+                    add(role, item)
+
+    def extract_patterns(self, text: Union[str, AnalyzedDocument]) -> Dict[str, List[Dict]]:
+        """Extract content based on patterns"""
+        results = {pattern_type: [] for pattern_type in self.patterns}
+        
+        # Track processed sentences to avoid duplicates; results keep the first 10 per category
+        self._match_patterns(self._as_document(text), results, set())
+        
+        print(f"📊 Stage 1: Extracting patterns and key points... Found {sum(len(v) for v in results.values())} pattern matches", file=sys.stderr)
+        return results
+    
+    def semantic_analysis(self, text: Union[str, AnalyzedDocument]) -> Dict[str, List[Dict]]:
+        """Analyze text for semantic patterns"""
+        results = {
+            'actions': [],
+            'problems': [],
+            'comparisons': []
+        }
+        
+        self._match_semantic(self._as_document(text), lambda key, item: results[key].append(item))
         
         # Sort by importance and limit to top 10
         for key in results:
-            results[key] = sorted(results[key], key=lambda x: x.get('importance', 0), reverse=True)[:10]
+            results[key] = sorted(results[key], key=lambda x: x.get('importance', 0), reverse=True)[:RESULT_LIMIT]
         
-        print(f"🧠 Stage 2: Running semantic analysis... Found {len(results['actions'])} actions", file=sys.stderr)
-        print(f"🧠 Stage 2: Running semantic analysis... Found {len(results['problems'])} problem-solution pairs", file=sys.stderr)
-        print(f"🧠 Stage 2: Running semantic analysis... Found {len(results['comparisons'])} comparisons", file=sys.stderr)
+        self._log_semantic(results)
         return results
     
-    def role_based_extraction(self, text: str) -> Dict[str, List[Dict]]:
+    def role_based_extraction(self, text: Union[str, AnalyzedDocument]) -> Dict[str, List[Dict]]:
         """Extract content based on target roles"""
-        doc = self.nlp(text)
-        sentences = [sent.text.strip() for sent in doc.sents]
-        
         results = {role: [] for role in self.role_patterns.keys()}
         
-        # Encode all sentences for similarity comparison
-        embeddings = self.sentence_model.encode(sentences)
-        
-        for i, sentence in enumerate(sentences):
-            sentence_lower = sentence.lower()
-            for role, patterns in self.role_patterns.items():
-                if any(pattern in sentence_lower for pattern in patterns):
-                    results[role].append({
-                        'content': sentence,
-                        'matched_patterns': [p for p in patterns if p in sentence_lower],
-                        'importance': self._calculate_importance(embeddings[i], embeddings)
-                    })
+        self._match_roles(self._as_document(text), lambda role, item: results[role].append(item))
         
         # Sort by importance and limit to top 10 per role
         for role in results:
-            results[role] = sorted(results[role], key=lambda x: x.get('importance', 0), reverse=True)[:10]
+            results[role] = sorted(results[role], key=lambda x: x.get('importance', 0), reverse=True)[:RESULT_LIMIT]
         
+        self._log_roles(results)
+        return results
+
+    def _log_semantic(self, results: Dict[str, List[Dict]]):
+        print(f"🧠 Stage 2: Running semantic analysis... Found {len(results['actions'])} actions", file=sys.stderr)
+        print(f"🧠 Stage 2: Running semantic analysis... Found {len(results['problems'])} problem-solution pairs", file=sys.stderr)
+        print(f"🧠 Stage 2: Running semantic analysis... Found {len(results['comparisons'])} comparisons", file=sys.stderr)
+
+    def _log_roles(self, results: Dict[str, List[Dict]]):
         for role, items in results.items():
             if items:
                 print(f"👥 Stage 3: Analyzing role-based content... Found {len(items)} {role}-related items", file=sys.stderr)
-        return results
-    
-    def _calculate_importance(self, sentence_embedding: np.ndarray, all_embeddings: np.ndarray) -> float:
-        """Calculate importance score based on centrality"""
-        similarities = np.dot(all_embeddings, sentence_embedding)
-        return float(np.mean(similarities))
     
+    def _cache_key(self, text: str) -> Optional[str]:
+        return ResultCache.make_key(text, self.cache_config) if self.cache is not None else None
+
+    def _cached(self, key: Optional[str]) -> Optional[Dict]:
+        result = self.cache.get(key) if key else None
+        if result is not None:
+            print("⚡ Using cached preprocessing result", file=sys.stderr)
+        return result
+
     def process(self, text: str) -> Dict:
-        """Process text through all stages"""
+        """Process text through all stages, reusing a cached result when available"""
+        key = self._cache_key(text)
+        result = self._cached(key)
+        if result is None:
+            result = self._process_text(text)
+            if key:
+                self.cache.put(key, result)
+        return result
+
+    def _process_text(self, text: str) -> Dict:
         print("🔄 Building semantic model...", file=sys.stderr)
         
-        # Limit text length to approximately 6000 tokens (about 24000 characters)
-        MAX_CHARS = 24000
+        # Long transcripts are processed in bounded windows instead of being truncated
         if len(text) > MAX_CHARS:
-            print(f"⚠️ Text too long ({len(text)} chars), truncating to {MAX_CHARS} chars...", file=sys.stderr)
-            text = text[:MAX_CHARS]
+            print(f"⚠️ Text too long ({len(text)} chars), processing in {MAX_CHARS} char windows...", file=sys.stderr)
+            return self.process_stream(text[i:i + MAX_CHARS] for i in range(0, len(text), MAX_CHARS))
         
-        pattern_results = self.extract_patterns(text)
-        semantic_results = self.semantic_analysis(text)
-        role_results = self.role_based_extraction(text)
+        # Parse and encode once, then let every stage reuse the result
+        return self._process_document(self.analyze(text))
+
+    def _empty_results(self) -> Tuple[Dict, Dict, Dict]:
+        return (
+            {pattern_type: [] for pattern_type in self.patterns},
+            {key: [] for key in ('actions', 'problems', 'comparisons')},
+            {role: [] for role in self.role_patterns}
+        )
+
+    def _process_document(self, document: AnalyzedDocument) -> Dict:
+        pattern_results, semantic_results, role_results = self._empty_results()
+        if 'patterns' in self.stages:
+            pattern_results = self.extract_patterns(document)
+        if 'semantic' in self.stages:
+            semantic_results = self.semantic_analysis(document)
+        if 'roles' in self.stages:
+            role_results = self.role_based_extraction(document)
         
         print("✨ Finalizing preprocessing...", file=sys.stderr)
+        return self._combine(pattern_results, semantic_results, role_results, len(document.text))
+
+    def process_many(self, texts: Iterable[str], batch_size: int = 32, n_process: int = 1) -> Iterator[Dict]:
+        """Process many transcripts, yielding one result per input in order.
+
+        Transcripts are grouped ``batch_size`` at a time so spaCy parses them
+        through ``nlp.pipe`` (optionally with ``n_process`` workers) and the
+        sentences of the whole group share one encode call. Transcripts longer
+        than MAX_CHARS are streamed on their own as in process(), and cached
+        results are returned without parsing.
+        """
+        batch: List[str] = []
         
+        def flush() -> Iterator[Dict]:
+            keys = [self._cache_key(text) for text in batch]
+            results = [self._cached(key) for key in keys]
+            
+            # Only uncached short transcripts go through the shared parse and encode
+            short = [text for text, result in zip(batch, results) if result is None and len(text) <= MAX_CHARS]
+            documents = iter(self.analyze_many(short, batch_size, n_process)) if short else iter(())
+            
+            for text, key, result in zip(batch, keys, results):
+                if result is None and len(text) > MAX_CHARS:
+                    result = self.process(text)
+                elif result is None:
+                    result = self._process_document(next(documents))
+                    if key:
+                        self.cache.put(key, result)
+                yield result
+            batch.clear()
+        
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= batch_size:
+                yield from flush()
+        if batch:
+            yield from flush()
+
+    def process_stream(self, chunks: Iterable[str], window_chars: int = MAX_CHARS,
+                       overlap: int = WINDOW_OVERLAP) -> Dict:
+        """Process text arriving in chunks of any size with flat memory use.
+
+        Text is buffered into windows of about ``window_chars`` characters cut at
+        whitespace. The last ``overlap`` sentences of each window are carried into
+        the next one so sentences split by the cut are parsed whole and every
+        emitted sentence still sees its neighbours for context and
+        problem-solution lookahead. Pattern matches keep the first 10 per
+        category and scored items are merged into running top-10 heaps, with
+        importance measured against the mean embedding of all text seen so far.
+        """
+        pattern_results = {pattern_type: [] for pattern_type in self.patterns}
+        processed: Set[str] = set()
+        semantic_heaps = {key: TopItems(RESULT_LIMIT) for key in ('actions', 'problems', 'comparisons')}
+        role_heaps = {role: TopItems(RESULT_LIMIT) for role in self.role_patterns}
+        
+        embedding_sum = None
+        embedding_count = 0
+        emitted = 0
+        total_length = 0
+        before = ""
+        carry = ""
+        buffer = ""
+        window_count = 0
+        
+        def windows():
+            nonlocal buffer, total_length
+            for chunk in chunks:
+                total_length += len(chunk)
+                buffer += chunk
+                while len(buffer) >= window_chars:
+                    cut = buffer.rfind(' ', 0, window_chars)
+                    cut = window_chars if cut <= 0 else cut
+                    window, buffer = buffer[:cut], buffer[cut:]
+                    yield window, False
+            yield buffer, True
+        
+        for window, final in windows():
+            document = self.analyze(carry + window)
+            sents = list(document.doc.sents)
+            if not sents:
+                continue
+            
+            # Hold back the last sentences for the next window unless this is the end
+            keep = 0 if final else min(overlap, len(sents) - 1)
+            stop = len(sents) - keep
+            carry = document.text[sents[stop].start_char:] if keep else ""
+            window_count += 1
+            
+            # Score against the running mean of every emitted sentence, or window-local top-k
+            if self.needs_embeddings:
+                window_sum = document.embeddings[:stop].sum(axis=0)
+                embedding_sum = window_sum if embedding_sum is None else embedding_sum + window_sum
+                embedding_count += stop
+                if not self.centrality_top_k:
+                    document.reference = embedding_sum / embedding_count
+            
+            if 'patterns' in self.stages and any(len(items) < RESULT_LIMIT for items in pattern_results.values()):
+                self._match_patterns(document, pattern_results, processed,
+                                     stop=stop, offset=emitted, before=before)
+            if 'semantic' in self.stages:
+                self._match_semantic(document, lambda key, item: semantic_heaps[key].add(item),
+                                     stop=stop, before=before)
+            if 'roles' in self.stages:
+                self._match_roles(document, lambda role, item: role_heaps[role].add(item), stop=stop)
+            
+            print(f"STATUS:Preprocessed window {window_count} ({emitted + stop} sentences)", file=sys.stderr)
+            before = document.sentences[stop - 1]
+            emitted += stop
+        
+        semantic_results = {key: heap.items() for key, heap in semantic_heaps.items()}
+        role_results = {role: heap.items() for role, heap in role_heaps.items()}
+        
+        print(f"📊 Stage 1: Extracting patterns and key points... Found {sum(len(v) for v in pattern_results.values())} pattern matches", file=sys.stderr)
+        self._log_semantic(semantic_results)
+        self._log_roles(role_results)
+        print("✨ Finalizing preprocessing...", file=sys.stderr)
+        return self._combine(pattern_results, semantic_results, role_results, total_length)
+
+    def _combine(self, pattern_results: Dict, semantic_results: Dict, role_results: Dict, total_length: int) -> Dict:
         # Combine results
         return {
             'patterns': pattern_results,
             'semantic': semantic_results,
             'roles': role_results,
             'stats': {
-                'total_length': len(text),
+                'total_length': total_length,
                 'pattern_matches': sum(len(v) for v in pattern_results.values()),
                 'semantic_matches': sum(len(v) for v in semantic_results.values()),
                 'role_matches': sum(len(v) for v in role_results.values())
@@ -273,20 +849,177 @@ def get_video_id(url: str) -> str:
     return url
 
 def get_transcript(video_id: str) -> str:
-    """Get transcript from YouTube video"""
-    transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-    return ' '.join(item['text'] for item in transcript_list)
+    """Get transcript from YouTube video, cached under data/cache/transcripts"""
+    from transcript_fetcher import get_transcript_fetcher, transcript_text
+    return transcript_text(get_transcript_fetcher().get(video_id))
+
+def _transcript_text(value) -> str:
+    """Transcript text from a raw string, {'text'|'transcript': ...} or timed segments"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return _transcript_text(value.get('text', value.get('transcript', '')))
+    if isinstance(value, list):
+        return ' '.join(_transcript_text(item) for item in value)
+    return ''
+
+def read_batch_input(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (id, transcript) pairs from a JSONL file or a directory of .txt/.json transcripts"""
+    source = Path(path)
+    if source.is_dir():
+        for file in sorted(source.iterdir()):
+            if file.suffix == '.txt':
+                yield file.stem, file.read_text(encoding='utf-8')
+            elif file.suffix == '.json':
+                with open(file, encoding='utf-8') as f:
+                    yield file.stem, _transcript_text(json.load(f))
+        return
+    
+    with open(source, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record_id = record.get('id', record.get('videoId', str(line_number))) if isinstance(record, dict) else str(line_number)
+            yield record_id, _transcript_text(record)
+
+def run_batch(preprocessor: SmartPreprocessor, input_path: str, output=sys.stdout,
+              batch_size: int = 32, n_process: int = 1):
+    """Preprocess every transcript in input_path and write one JSON line per input"""
+    ids: List[str] = []
+    
+    def texts() -> Iterator[str]:
+        for record_id, text in read_batch_input(input_path):
+            ids.append(record_id)
+            yield text
+    
+    for index, result in enumerate(preprocessor.process_many(texts(), batch_size, n_process)):
+        output.write(json.dumps({'id': ids[index], 'result': result}) + "\n")
+        output.flush()
+        print(f"STATUS:Preprocessed {index + 1} transcripts", file=sys.stderr)
+
+def serve(preprocessor: SmartPreprocessor, stdin=sys.stdin, stdout=sys.stdout):
+    """Handle newline-delimited JSON requests with a single warm preprocessor.
+
+    Each request is one JSON object per line: ``{"id": ..., "text": ...}`` runs
+    the full pipeline, ``{"id": ..., "method": "health"}`` reports worker state
+    and ``{"method": "shutdown"}`` stops the loop. Every response is one line
+    carrying the request ``id`` with either ``result`` or ``error``. A
+    ``{"type": "ready"}`` line is written once the models are loaded.
+    """
+    started = time.time()
+    processed = 0
+
+    def respond(message: Dict):
+        stdout.write(json.dumps(message) + "\n")
+        stdout.flush()
+
+    # Only report ready once the models are warm
+    preprocessor.load_models()
+    respond({'type': 'ready', 'pid': os.getpid()})
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            method = request.get('method', 'process')
+
+            if method == 'health':
+                respond({'id': request_id, 'ok': True, 'result': {
+                    'status': 'ok',
+                    'processed': processed,
+                    'uptime': time.time() - started
+                }})
+            elif method == 'shutdown':
+                respond({'id': request_id, 'ok': True, 'result': {'status': 'stopping'}})
+                break
+            elif method == 'process':
+                result = preprocessor.process(request['text'])
+                processed += 1
+                respond({'id': request_id, 'ok': True, 'result': result})
+            else:
+                raise ValueError(f"Unknown method: {method}")
+
+        except Exception as e:
+            print(f"STATUS:Error: {str(e)}", file=sys.stderr)
+            respond({'id': request_id, 'ok': False, 'error': str(e)})
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Smart transcript preprocessing')
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep the models loaded and handle newline-delimited JSON requests on stdin')
+    parser.add_argument('--nlp-mode', choices=NLP_MODES, default='parser',
+                        help='spaCy pipeline used for sentence splitting (see benchmark_segmentation.py)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help='Stages to run; the others come back empty')
+    parser.add_argument('--no-role-scoring', action='store_true',
+                        help='Keep role items in document order so role-only runs skip the embedding model')
+    parser.add_argument('--centrality-top-k', type=int, default=None,
+                        help='Score importance by the k most similar sentences instead of the mean')
+    parser.add_argument('--centrality-max-anchors', type=int, default=None,
+                        help='Approximate top-k centrality against at most this many sentences')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read stdin incrementally and process it in bounded windows')
+    parser.add_argument('--batch', metavar='PATH',
+                        help='Process a JSONL file or directory of transcripts, writing JSONL results')
+    parser.add_argument('--output', metavar='FILE',
+                        help='Where --batch writes its JSONL results (default: stdout)')
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help='Transcripts per nlp.pipe / encode batch in --batch mode')
+    parser.add_argument('--n-process', type=int, default=1,
+                        help='spaCy worker processes in --batch mode')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always recompute instead of using the on-disk result and embedding caches')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='Drop all cached preprocessing results before running')
+    args = parser.parse_args()
+
     try:
-        # Read raw text from stdin
-        text = sys.stdin.read()
+        cache = None
+        embedding_cache = None
+        if not args.no_cache:
+            cache = ResultCache()
+            embedding_cache = EmbeddingCache(SENTENCE_MODEL_NAME)
+            if args.clear_cache:
+                cache.clear()
 
         # Initialize preprocessor
-        preprocessor = SmartPreprocessor()
-        
-        # Process the text
-        result = preprocessor.process(text)
+        preprocessor = SmartPreprocessor(
+            centrality_top_k=args.centrality_top_k,
+            centrality_max_anchors=args.centrality_max_anchors,
+            cache=cache,
+            embedding_cache=embedding_cache,
+            nlp_mode=args.nlp_mode,
+            stages=args.stages,
+            score_roles=not args.no_role_scoring
+        )
+
+        if args.serve:
+            serve(preprocessor)
+            sys.exit(0)
+
+        if args.batch:
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as output:
+                    run_batch(preprocessor, args.batch, output, args.batch_size, args.n_process)
+            else:
+                run_batch(preprocessor, args.batch, sys.stdout, args.batch_size, args.n_process)
+            sys.exit(0)
+
+        if args.stream:
+            # Feed stdin through in pieces so memory stays flat for any length
+            result = preprocessor.process_stream(iter(lambda: sys.stdin.read(65536), ''))
+        else:
+            # Read raw text from stdin
+            text = sys.stdin.read()
+
+            # Process the text
+            result = preprocessor.process(text)
         
         # Output JSON result
         print(json.dumps(result, indent=4))
@@ -0,0 +1,175 @@
+"""Concurrent YouTube transcript fetching with a local cache.
+
+Raw timed segments (``[{'text', 'start', 'duration'}, ...]``) are stored
+gzip-compressed under data/cache/transcripts/<videoId>.<language>.json.gz, so
+a transcript is downloaded once per video and language. Downloads run on a
+thread pool; every request to a host first waits its turn in a per-host rate
+limit. The transport that talks to YouTube can be swapped, e.g. for a local
+stand-in in tests; transports that do not name a host are not rate limited.
+
+    python scripts/transcript_fetcher.py VIDEO_ID [VIDEO_ID ...] --workers 8
+    python scripts/transcript_fetcher.py --ids-file video_ids.txt
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'cache' / 'transcripts'
+
+DEFAULT_LANGUAGES = ('en',)
+DEFAULT_WORKERS = int(os.getenv('TRANSCRIPT_WORKERS', '8'))
+# Requests per second sent to any one host
+DEFAULT_RATE_LIMIT = float(os.getenv('TRANSCRIPT_RATE_LIMIT', '5'))
+
+class YouTubeTranscriptTransport:
+    """Downloads transcripts with youtube_transcript_api"""
+    host = 'www.youtube.com'
+
+    def fetch(self, video_id: str, languages: Sequence[str]) -> Tuple[str, List[Dict[str, Any]]]:
+        """(language code, raw segments) of the first available transcript in ``languages``"""
+        from youtube_transcript_api import YouTubeTranscriptApi
+        api = YouTubeTranscriptApi()
+        # 1.x lists transcripts on an instance; older releases only have the classmethod
+        transcripts = api.list(video_id) if hasattr(api, 'list') else YouTubeTranscriptApi.list_transcripts(video_id)
+        transcript = transcripts.find_transcript(list(languages))
+        return transcript.language_code, transcript.fetch()
+
+class HostRateLimiter:
+    """Spaces requests to each host at least ``1 / requests_per_second`` apart"""
+    def __init__(self, requests_per_second: float = DEFAULT_RATE_LIMIT):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class TranscriptFetcher:
+    """Fetches transcripts for many videos, reusing the on-disk cache.
+
+    ``transport`` needs a ``fetch(video_id, languages)`` method returning
+    ``(language, segments)``. Segments may be dicts or a 1.x
+    ``FetchedTranscript``. Requests are rate limited per ``host`` when the
+    transport names the host it talks to.
+    """
+    def __init__(self, transport=None, cache_dir: Optional[Path] = None,
+                 max_workers: int = DEFAULT_WORKERS, requests_per_second: float = DEFAULT_RATE_LIMIT,
+                 languages: Sequence[str] = DEFAULT_LANGUAGES):
+        self.transport = transport or YouTubeTranscriptTransport()
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(os.getenv('TRANSCRIPT_CACHE_DIR', DEFAULT_CACHE_DIR))
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.languages = tuple(languages)
+
+    def _cache_path(self, video_id: str, language: str) -> Path:
+        return self.cache_dir / f'{video_id}.{language}.json.gz'
+
+    def cached(self, video_id: str, languages: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Cached transcript in the first of ``languages`` that has one, or None"""
+        for language in languages or self.languages:
+            path = self._cache_path(video_id, language)
+            if path.exists():
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    return json.load(f)
+        return None
+
+    def _store(self, transcript: Dict[str, Any]):
+        path = self._cache_path(transcript['videoId'], transcript['language'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        temporary = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with gzip.open(temporary, 'wt', encoding='utf-8') as f:
+            json.dump(transcript, f, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    def get(self, video_id: str, languages: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """``{'videoId', 'language', 'segments'}`` for one video; transport errors are raised"""
+        languages = tuple(languages or self.languages)
+        transcript = self.cached(video_id, languages)
+        if transcript is not None:
+            return transcript
+
+        host = getattr(self.transport, 'host', None)
+        if host is not None:
+            self.rate_limiter.wait(host)
+        language, segments = self.transport.fetch(video_id, languages)
+        if hasattr(segments, 'to_raw_data'):
+            # youtube-transcript-api 1.x returns dataclass snippets
+            segments = segments.to_raw_data()
+        transcript = {
+            'videoId': video_id,
+            'language': language,
+            'segments': [dict(segment) for segment in segments],
+            'fetched': time.time()
+        }
+        self._store(transcript)
+        return transcript
+
+    def fetch_many(self, video_ids: Iterable[str],
+                   languages: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, Union[Dict[str, Any], Exception]]]:
+        """Yield ``(video_id, transcript or the exception it raised)`` in input order"""
+        def fetch(video_id: str):
+            try:
+                return self.get(video_id, languages)
+            except Exception as e:
+                return e
+
+        video_ids = list(video_ids)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from zip(video_ids, executor.map(fetch, video_ids))
+
+_fetcher: Optional[TranscriptFetcher] = None
+
+def get_transcript_fetcher() -> TranscriptFetcher:
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = TranscriptFetcher()
+    return _fetcher
+
+def transcript_text(transcript: Dict[str, Any]) -> str:
+    return ' '.join(segment['text'] for segment in transcript['segments'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Download and cache YouTube transcripts')
+    parser.add_argument('video_ids', nargs='*', help='YouTube video IDs')
+    parser.add_argument('--ids-file', help="File with one video ID per line, or '-' for stdin")
+    parser.add_argument('--languages', nargs='+', default=list(DEFAULT_LANGUAGES), help='Preferred languages, in order')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT, help='Requests per second per host')
+    args = parser.parse_args()
+
+    video_ids = list(args.video_ids)
+    if args.ids_file:
+        source = sys.stdin if args.ids_file == '-' else open(args.ids_file, encoding='utf-8')
+        video_ids += [line.strip() for line in source if line.strip()]
+        if source is not sys.stdin:
+            source.close()
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        parser.error('no video IDs given')
+
+    fetcher = TranscriptFetcher(max_workers=args.workers, requests_per_second=args.rate_limit, languages=args.languages)
+    started = time.perf_counter()
+    failed = 0
+    for video_id, result in fetcher.fetch_many(video_ids):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{video_id}: {type(result).__name__}: {result}", file=sys.stderr)
+        else:
+            print(f"{video_id}: {len(result['segments'])} segments ({result['language']})")
+
+    elapsed = time.perf_counter() - started
+    print(f"Fetched {len(video_ids) - failed} of {len(video_ids)} transcripts in {elapsed:.1f}s", file=sys.stderr)
+    sys.exit(1 if failed else 0)
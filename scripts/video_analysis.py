@@ -1,65 +1,190 @@
-"""Python wrapper for TypeScript video analysis modules."""
+"""Python entry points for video analysis.
+
+Detection, AI verification, analysis, template lookup and enrichment
+validation run natively on the video_analysis package; validation uses
+Python ports of the zod schemas in lib/video_validation.ts. run_ts_script
+still reaches the TypeScript modules (tests/test_video_validation.py uses it
+to check the ports against zod) through one long-lived ts-node process that
+speaks line-delimited JSON-RPC over stdin/stdout, so only the first call pays
+for npx resolution and the TypeScript compile.
+"""
+import atexit
+import copy
+import itertools
 import json
+import os
 import subprocess
-from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from video_analysis.detection import detect_video_type as _detect_video_type
+from video_analysis.types import VideoType, VIDEO_TEMPLATES, to_video_metadata
+from video_analysis import validation
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+BRIDGE_COMMAND = [
+    'npx', 'ts-node', '--transpile-only', '-r', 'tsconfig-paths/register',
+    '-O', '{"module":"commonjs"}', 'lib/python_bridge.ts'
+]
+
+# Seconds to wait for ts-node to compile and load the bridge, and for a single call
+BRIDGE_STARTUP_TIMEOUT = float(os.getenv('TS_BRIDGE_STARTUP_TIMEOUT', '60'))
+BRIDGE_CALL_TIMEOUT = float(os.getenv('TS_BRIDGE_CALL_TIMEOUT', '10'))
+
+class TsBridge:
+    """Persistent ts-node process answering JSON-RPC requests by id.
+
+    Calls are thread-safe; a reader thread matches responses to pending
+    requests. A call that times out kills the process, and a process that
+    exits fails whatever was in flight; either way the next call starts a
+    fresh one.
+    """
+    def __init__(self, command: Optional[List[str]] = None, cwd: Optional[Path] = None,
+                 startup_timeout: float = BRIDGE_STARTUP_TIMEOUT, call_timeout: float = BRIDGE_CALL_TIMEOUT):
+        self.command = command or BRIDGE_COMMAND
+        self.cwd = cwd or ROOT_DIR
+        self.startup_timeout = startup_timeout
+        self.call_timeout = call_timeout
+        self._process = None
+        self._ready = None
+        # Requests in flight on the current process, by id
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _start(self):
+        process = subprocess.Popen(
+            self.command, cwd=str(self.cwd), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1
+        )
+        ready, pending = Future(), {}
+        threading.Thread(target=self._read, args=(process, ready, pending), daemon=True).start()
+        self._process, self._ready, self._pending = process, ready, pending
+
+    def _read(self, process: subprocess.Popen, ready: Future, pending: Dict[int, Future]):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                # Stray console output from a TypeScript module
+                continue
+            if message.get('ready'):
+                ready.set_result(True)
+                continue
+            with self._lock:
+                future = pending.pop(message.get('id'), None)
+            if future is None:
+                continue
+            if 'error' in message:
+                future.set_exception(RuntimeError(f"TypeScript bridge error: {message['error']}"))
+            else:
+                future.set_result(message.get('result'))
+
+        # Process exited: fail everything still waiting on it
+        process.wait()
+        error = RuntimeError(f"TypeScript bridge exited with code {process.returncode}")
+        if not ready.done():
+            ready.set_exception(error)
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            failed = list(pending.values())
+            pending.clear()
+        for future in failed:
+            if not future.done():
+                future.set_exception(error)
+
+    def _ensure_running(self) -> Tuple[subprocess.Popen, Dict[int, Future]]:
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            process, ready, pending = self._process, self._ready, self._pending
+        try:
+            ready.result(timeout=self.startup_timeout)
+        except FutureTimeoutError:
+            self._kill(process)
+            raise TimeoutError(f"TypeScript bridge did not start within {self.startup_timeout}s")
+        return process, pending
+
+    def call(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        process, pending = self._ensure_running()
+        request_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            pending[request_id] = future
+            try:
+                process.stdin.write(json.dumps({'id': request_id, 'method': method, 'params': params}) + '\n')
+                process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                pending.pop(request_id, None)
+                raise RuntimeError(f"TypeScript bridge is not accepting requests: {e}")
+        try:
+            return future.result(timeout=timeout or self.call_timeout)
+        except FutureTimeoutError:
+            # A hung process would stall every later call too
+            self._kill(process)
+            raise TimeoutError(f"TypeScript bridge call {method!r} timed out")
+
+    def _kill(self, process: subprocess.Popen):
+        """Kill a process and detach it so the next call starts a new one"""
+        with self._lock:
+            if self._process is process:
+                self._process = None
+        if process.poll() is None:
+            process.kill()
+
+    def close(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+_bridge: Optional[TsBridge] = None
+
+def get_ts_bridge() -> TsBridge:
+    global _bridge
+    if _bridge is None:
+        _bridge = TsBridge()
+        atexit.register(_bridge.close)
+    return _bridge
 
 def run_ts_script(script_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-    """Run a TypeScript script and return its JSON output."""
+    """Call a TypeScript module through the shared bridge and return its JSON result."""
     try:
-        # Convert args to JSON string
-        args_json = json.dumps(args)
-        
-        # Run the TypeScript script using ts-node
-        result = subprocess.run(
-            ['npx', 'ts-node', f'lib/{script_name}.ts', args_json],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        
-        # Parse and return the JSON output
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running TypeScript script: {e.stderr}")
-        raise
-    except json.JSONDecodeError as e:
-        print(f"Error parsing TypeScript output: {e}")
+        return get_ts_bridge().call(script_name, args)
+    except (RuntimeError, TimeoutError) as e:
+        print(f"Error running TypeScript script: {e}")
         raise
 
 def detect_video_type(metadata: Dict[str, Any]) -> Dict[str, Any]:
     """Detect video type using pattern-based analysis."""
-    return run_ts_script('video_detection', {
-        'metadata': metadata,
-        'action': 'detect'
-    })
+    return _detect_video_type(to_video_metadata(metadata))
 
 async def verify_video_type(metadata: Dict[str, Any], candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Verify video type using OpenAI."""
-    return run_ts_script('ai', {
-        'metadata': metadata,
-        'candidates': candidates,
-        'action': 'verify_type'
-    })
+    from video_analysis import openai_analysis
+    video_type, confidence = await openai_analysis.verify_video_type(to_video_metadata(metadata), candidates)
+    return {'type': str(video_type), 'confidence': confidence}
 
 async def generate_video_analysis(metadata: Dict[str, Any], video_type: str) -> Dict[str, Any]:
     """Generate detailed video analysis using OpenAI."""
-    return run_ts_script('ai', {
-        'metadata': metadata,
-        'type': video_type,
-        'action': 'analyze'
-    })
+    from video_analysis import openai_analysis
+    return await openai_analysis.generate_video_analysis(to_video_metadata(metadata), VideoType(video_type))
 
 def get_template_config(video_type: str) -> Dict[str, Any]:
     """Get template configuration for a video type."""
-    return run_ts_script('video_templates', {
-        'type': video_type,
-        'action': 'get_config'
-    })
+    if video_type not in VIDEO_TEMPLATES:
+        raise ValueError(f"No template for video type: {video_type}")
+    # A copy, so callers cannot change the templates prompts are built from
+    return copy.deepcopy(VIDEO_TEMPLATES[video_type])
 
 def validate_enrichment(content: Dict[str, Any], video_type: str) -> Dict[str, Any]:
-    """Validate video enrichment against template."""
-    return run_ts_script('video_validation', {
-        'content': content,
-        'type': video_type,
-        'action': 'validate'
-    })
+    """Validate video enrichment against the schema for its type."""
+    return validation.validate_enrichment(video_type, content)
@@ -0,0 +1,430 @@
+"""Bulk video analysis through the OpenAI Batch API.
+
+Requests are built with the same prompt generators as the interactive calls
+in openai_analysis, written to a local job store, submitted as JSONL batches
+and polled until they finish. Every step is recorded in the store, so after a
+crash ``resume`` finds batches whose creation was never recorded, submits
+whatever was never sent and keeps polling the rest.
+
+    python -m video_analysis.batch submit data/video_meta_*.json
+    python -m video_analysis.batch resume
+    python -m video_analysis.batch status
+    python -m video_analysis.batch results --output data/analysis/batch_results.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import openai
+
+from .types import VideoType, VideoMetadata, VIDEO_TEMPLATES, to_video_metadata
+from .detection import detect_video_type
+from .cache import ResponseCache
+from .openai_analysis import analysis_request, summary_request, get_response_cache
+from .tokens import get_usage_tracker
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'openai' / 'batches.sqlite'
+
+KINDS = ('analysis', 'summary')
+REQUEST_BUILDERS = {'analysis': analysis_request, 'summary': summary_request}
+
+# Batch API limits per input file, with some headroom on the size
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# Tag on every batch this module creates, used to find them again after a crash
+BATCH_METADATA = {'source': 'video_analysis'}
+
+class BatchJobStore:
+    """sqlite record of every batched request and the batch it was sent in.
+
+    Requests move from ``pending`` to ``submitting`` once their input file
+    is uploaded, to ``submitted`` when their batch is created and end as
+    ``completed`` or ``failed``. Uploads whose batch was not recorded yet
+    are kept in ``uploads``.
+    """
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else Path(os.getenv('OPENAI_BATCH_STORE', DEFAULT_STORE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS requests ('
+            'custom_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, kind TEXT NOT NULL, video_type TEXT NOT NULL, '
+            'body TEXT NOT NULL, status TEXT NOT NULL, batch_id TEXT, result TEXT, error TEXT)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS requests_status ON requests (status, batch_id)')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS batches ('
+            'batch_id TEXT PRIMARY KEY, input_file_id TEXT NOT NULL, status TEXT NOT NULL, '
+            'request_count INTEGER NOT NULL, created REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS uploads ('
+            'input_file_id TEXT PRIMARY KEY, custom_ids TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        self._db.commit()
+
+    def add_requests(self, requests: Iterable[Dict[str, Any]]) -> int:
+        """Queue requests; ones already queued are kept unless they failed."""
+        added = 0
+        for request in requests:
+            row = self._db.execute('SELECT status FROM requests WHERE custom_id = ?', (request['custom_id'],)).fetchone()
+            if row is not None and row[0] != 'failed':
+                continue
+            self._db.execute(
+                'INSERT OR REPLACE INTO requests (custom_id, video_id, kind, video_type, body, status) '
+                "VALUES (?, ?, ?, ?, ?, 'pending')",
+                (request['custom_id'], request['video_id'], request['kind'], request['video_type'],
+                 json.dumps(request['body']))
+            )
+            added += 1
+        self._db.commit()
+        return added
+
+    def pending(self) -> List[Dict[str, Any]]:
+        rows = self._db.execute(
+            "SELECT custom_id, body FROM requests WHERE status = 'pending' ORDER BY rowid"
+        ).fetchall()
+        return [{'custom_id': custom_id, 'body': json.loads(body)} for custom_id, body in rows]
+
+    def body(self, custom_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute('SELECT body FROM requests WHERE custom_id = ?', (custom_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def kind(self, custom_id: str) -> Optional[str]:
+        row = self._db.execute('SELECT kind FROM requests WHERE custom_id = ?', (custom_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_upload(self, input_file_id: str, custom_ids: List[str]):
+        """Record an uploaded input file before its batch is created"""
+        self._db.execute(
+            'INSERT INTO uploads (input_file_id, custom_ids, created) VALUES (?, ?, ?)',
+            (input_file_id, json.dumps(custom_ids), time.time())
+        )
+        self._db.executemany(
+            "UPDATE requests SET status = 'submitting' WHERE custom_id = ?",
+            [(custom_id,) for custom_id in custom_ids]
+        )
+        self._db.commit()
+
+    def uploads(self) -> List[Dict[str, Any]]:
+        """Uploaded input files with no recorded batch, oldest first"""
+        rows = self._db.execute('SELECT input_file_id, custom_ids, created FROM uploads ORDER BY created').fetchall()
+        return [{'input_file_id': input_file_id, 'custom_ids': json.loads(custom_ids), 'created': created}
+                for input_file_id, custom_ids, created in rows]
+
+    def add_batch(self, batch_id: str, input_file_id: str, status: str, custom_ids: List[str]):
+        now = time.time()
+        self._db.execute('DELETE FROM uploads WHERE input_file_id = ?', (input_file_id,))
+        self._db.execute(
+            'INSERT INTO batches (batch_id, input_file_id, status, request_count, created, updated) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (batch_id, input_file_id, status, len(custom_ids), now, now)
+        )
+        self._db.executemany(
+            "UPDATE requests SET status = 'submitted', batch_id = ? WHERE custom_id = ?",
+            [(batch_id, custom_id) for custom_id in custom_ids]
+        )
+        self._db.commit()
+
+    def active_batches(self) -> List[str]:
+        placeholders = ','.join('?' * len(TERMINAL_STATUSES))
+        rows = self._db.execute(
+            f'SELECT batch_id FROM batches WHERE status NOT IN ({placeholders}) ORDER BY created', TERMINAL_STATUSES
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def set_batch_status(self, batch_id: str, status: str):
+        self._db.execute('UPDATE batches SET status = ?, updated = ? WHERE batch_id = ?', (status, time.time(), batch_id))
+        self._db.commit()
+
+    def complete(self, custom_id: str, result: Any):
+        self._db.execute(
+            "UPDATE requests SET status = 'completed', result = ?, error = NULL WHERE custom_id = ?",
+            (json.dumps(result), custom_id)
+        )
+
+    def fail(self, custom_id: str, error: str):
+        self._db.execute("UPDATE requests SET status = 'failed', error = ? WHERE custom_id = ?", (error, custom_id))
+
+    def release(self, batch_id: str, status: str = 'pending', error: Optional[str] = None):
+        """Move requests of a finished batch that got no result back to ``status``"""
+        if status == 'pending':
+            self._db.execute(
+                "UPDATE requests SET status = 'pending', batch_id = NULL WHERE batch_id = ? AND status = 'submitted'",
+                (batch_id,)
+            )
+        else:
+            self._db.execute(
+                "UPDATE requests SET status = ?, error = ? WHERE batch_id = ? AND status = 'submitted'",
+                (status, error, batch_id)
+            )
+        self._db.commit()
+
+    def commit(self):
+        self._db.commit()
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._db.execute('SELECT status, COUNT(*) FROM requests GROUP BY status').fetchall())
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """Finished requests grouped by video ID"""
+        videos: Dict[str, Dict[str, Any]] = {}
+        rows = self._db.execute(
+            "SELECT video_id, kind, video_type, status, result, error FROM requests "
+            "WHERE status IN ('completed', 'failed') ORDER BY rowid"
+        ).fetchall()
+        for video_id, kind, video_type, status, result, error in rows:
+            video = videos.setdefault(video_id, {'videoId': video_id, 'type': video_type})
+            if status == 'completed':
+                video[kind] = json.loads(result)
+            else:
+                video.setdefault('errors', {})[kind] = error
+        return videos
+
+    def close(self):
+        self._db.close()
+
+def build_requests(
+    metadata_list: Iterable[VideoMetadata],
+    video_type: Optional[VideoType] = None,
+    kinds: Iterable[str] = KINDS
+) -> List[Dict[str, Any]]:
+    """Batch requests for each video, typed by detection unless video_type is given."""
+    requests = []
+    for metadata in metadata_list:
+        detected_type = VideoType(video_type or detect_video_type(metadata)['type'])
+        if str(detected_type) not in VIDEO_TEMPLATES:
+            print(f"Skipping {metadata['videoId']}: no template for type {detected_type}", file=sys.stderr)
+            continue
+        for kind in kinds:
+            requests.append({
+                'custom_id': f"{metadata['videoId']}:{kind}",
+                'video_id': metadata['videoId'],
+                'kind': kind,
+                'video_type': str(detected_type),
+                'body': REQUEST_BUILDERS[kind](metadata, detected_type)
+            })
+    return requests
+
+def _chunks(requests: List[Dict[str, Any]]) -> Iterable[List[bytes]]:
+    """JSONL lines grouped to stay under the Batch API's per-file limits"""
+    chunk, size = [], 0
+    for request in requests:
+        line = json.dumps({
+            'custom_id': request['custom_id'],
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': request['body']
+        }).encode('utf-8') + b'\n'
+        if chunk and (len(chunk) >= MAX_BATCH_REQUESTS or size + len(line) > MAX_BATCH_BYTES):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line)
+    if chunk:
+        yield chunk
+
+class BatchRunner:
+    """Submits queued requests and collects their results into a BatchJobStore."""
+    def __init__(self, store: Optional[BatchJobStore] = None, client: Optional[openai.OpenAI] = None):
+        self.store = store or BatchJobStore()
+        self._client = client
+
+    @property
+    def client(self) -> openai.OpenAI:
+        if self._client is None:
+            api_key = os.getenv('OPENAI_API_KEY')
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable not set")
+            self._client = openai.OpenAI(api_key=api_key, organization=os.getenv('OPENAI_ORGANIZATION_ID'))
+        return self._client
+
+    def submit(self, requests: List[Dict[str, Any]]) -> List[str]:
+        added = self.store.add_requests(requests)
+        print(f"Queued {added} new requests ({len(requests) - added} already queued)", file=sys.stderr)
+        return self.submit_pending()
+
+    def submit_pending(self) -> List[str]:
+        """Upload every pending request and create batches for them"""
+        pending = self.store.pending()
+        batch_ids = []
+        start = 0
+        for lines in _chunks(pending):
+            custom_ids = [request['custom_id'] for request in pending[start:start + len(lines)]]
+            start += len(lines)
+            input_file = self.client.files.create(file=('video_analysis.jsonl', b''.join(lines)), purpose='batch')
+            # Recorded first, so a crash before add_batch cannot lead to a second batch
+            self.store.add_upload(input_file.id, custom_ids)
+            batch_ids.append(self._create_batch(input_file.id, custom_ids))
+        return batch_ids
+
+    def _create_batch(self, input_file_id: str, custom_ids: List[str]) -> str:
+        batch = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+            metadata=BATCH_METADATA
+        )
+        self.store.add_batch(batch.id, input_file_id, batch.status, custom_ids)
+        print(f"Submitted batch {batch.id} with {len(custom_ids)} requests", file=sys.stderr)
+        return batch.id
+
+    def reconcile(self) -> List[str]:
+        """Settle uploads left by an interrupted submit.
+
+        Batches that were created but never recorded are looked up among this
+        module's batches on the account and recorded, and the results of any
+        that have already finished are collected; uploads that never got
+        a batch are submitted from the file already uploaded.
+        """
+        uploads = {upload['input_file_id']: upload for upload in self.store.uploads()}
+        if not uploads:
+            return []
+        # Batches are listed newest first; nothing older than the first upload can match
+        oldest = min(upload['created'] for upload in uploads.values()) - 60
+        batch_ids = []
+        for batch in self.client.batches.list(limit=100):
+            if batch.created_at < oldest:
+                break
+            if (batch.metadata or {}).get('source') != BATCH_METADATA['source']:
+                continue
+            upload = uploads.pop(batch.input_file_id, None)
+            if upload is None:
+                continue
+            self.store.add_batch(batch.id, batch.input_file_id, batch.status, upload['custom_ids'])
+            batch_ids.append(batch.id)
+            print(f"Recovered batch {batch.id} with {len(upload['custom_ids'])} requests", file=sys.stderr)
+            if batch.status in TERMINAL_STATUSES:
+                # wait() only polls active batches; collect one that finished while we were down
+                self.poll(batch.id)
+            if not uploads:
+                break
+        for upload in uploads.values():
+            batch_ids.append(self._create_batch(upload['input_file_id'], upload['custom_ids']))
+        return batch_ids
+
+    def poll(self, batch_id: str) -> str:
+        """Refresh one batch, collecting its results once it has finished"""
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_STATUSES:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    self._collect(self.client.files.content(file_id).text)
+            if batch.status == 'failed':
+                errors = getattr(batch, 'errors', None)
+                self.store.release(batch_id, 'failed', str(errors) if errors else 'Batch failed')
+            elif batch.status == 'completed':
+                self.store.release(batch_id, 'failed', 'Missing from batch output')
+            else:
+                # Expired or cancelled: whatever did not finish is sent again on resume
+                self.store.release(batch_id)
+        self.store.set_batch_status(batch_id, batch.status)
+        return batch.status
+
+    def _collect(self, output: str):
+        cache = get_response_cache()
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            custom_id = entry['custom_id']
+            response = entry.get('response') or {}
+            if entry.get('error') or response.get('status_code') != 200:
+                error = entry.get('error') or response.get('body', {}).get('error')
+                self.store.fail(custom_id, json.dumps(error))
+                continue
+
+            kind = self.store.kind(custom_id)
+            get_usage_tracker().record(f'batch_{kind}', response['body'].get('model', ''), response['body'].get('usage'))
+            choice = response['body']['choices'][0]
+            content = choice['message']['content']
+            try:
+                result = json.loads(content) if kind == 'analysis' else content.strip()
+            except json.JSONDecodeError as e:
+                self.store.fail(custom_id, f"Invalid analysis JSON: {e}")
+                continue
+            self.store.complete(custom_id, result)
+
+            # Share the response with interactive calls for the same prompt
+            body = self.store.body(custom_id)
+            if cache and body:
+                key = ResponseCache.make_key(body['model'], body['messages'], body['temperature'], body['max_tokens'])
+                cache.put(key, {'content': content, 'finish_reason': choice.get('finish_reason')})
+        self.store.commit()
+
+    def wait(self, interval: float = 30.0, max_interval: float = 600.0) -> Dict[str, int]:
+        """Poll active batches until all have finished, backing off while nothing changes"""
+        delay = interval
+        statuses: Dict[str, str] = {}
+        while True:
+            active = self.store.active_batches()
+            if not active:
+                return self.store.counts()
+            changed = False
+            for batch_id in active:
+                status = self.poll(batch_id)
+                changed = changed or statuses.get(batch_id) != status
+                statuses[batch_id] = status
+            if not self.store.active_batches():
+                return self.store.counts()
+
+            delay = interval if changed else min(delay * 2, max_interval)
+            sleep_for = delay * random.uniform(0.8, 1.2)
+            print(f"STATUS:{len(active)} batches in progress, next check in {sleep_for:.0f}s", file=sys.stderr)
+            time.sleep(sleep_for)
+
+    def resume(self, **wait_options) -> Dict[str, int]:
+        """Submit anything left pending by an interrupted run, then wait for every batch"""
+        self.reconcile()
+        self.submit_pending()
+        return self.wait(**wait_options)
+
+def load_metadata(paths: Iterable[str]) -> List[VideoMetadata]:
+    metadata = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            metadata.append(to_video_metadata(json.load(f)))
+    return metadata
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze videos in bulk through the OpenAI Batch API')
+    parser.add_argument('--store', help='Job store path (default: data/cache/openai/batches.sqlite)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help='Queue and submit requests for video metadata files')
+    submit.add_argument('metadata', nargs='+', help='video_meta_<id>.json files')
+    submit.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    submit.add_argument('--type', choices=[str(t) for t in VideoType], help='Use this type instead of detection')
+    submit.add_argument('--no-wait', action='store_true', help='Return once the batches are created')
+
+    commands.add_parser('resume', help='Submit pending requests and wait for active batches')
+    commands.add_parser('status', help='Show request counts by status')
+
+    results = commands.add_parser('results', help='Write finished results as JSONL')
+    results.add_argument('--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    runner = BatchRunner(BatchJobStore(args.store) if args.store else None)
+    if args.command == 'submit':
+        runner.submit(build_requests(load_metadata(args.metadata), args.type, args.kinds))
+        if not args.no_wait:
+            runner.wait()
+    elif args.command == 'resume':
+        runner.resume()
+    elif args.command == 'results':
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        for video in runner.store.results().values():
+            out.write(json.dumps(video) + '\n')
+        if args.output:
+            out.close()
+    print(json.dumps(runner.store.counts()), file=sys.stderr)
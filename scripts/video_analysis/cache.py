@@ -0,0 +1,112 @@
+"""Persistent sqlite caches: OpenAI chat completion responses and the LRU store behind them."""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'openai' / 'responses.sqlite'
+
+# A week by default; generated analyses don't go stale quickly
+DEFAULT_TTL = int(os.getenv('OPENAI_CACHE_TTL', str(7 * 24 * 3600)))
+
+class SqliteCache:
+    """JSON values in one sqlite table, evicted least recently used first.
+
+    Subclasses name the ``table`` and decide how keys are made. Once the
+    table holds more than ``max_entries`` values or ``max_bytes`` of JSON,
+    the least recently used are evicted; with a ``ttl``, entries also expire
+    that many seconds after they were stored.
+    """
+    table = 'entries'
+    # Formatted with the number of entries evicted
+    eviction_message = "Evicted {} cached entries"
+
+    def __init__(self, path: Path, max_entries: int, max_bytes: int, ttl: Optional[float] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'created REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        columns = {row[1] for row in self._db.execute(f'PRAGMA table_info({self.table})')}
+        if 'created' not in columns:
+            # Tables written before entries could expire
+            self._db.execute(f'ALTER TABLE {self.table} ADD COLUMN created REAL NOT NULL DEFAULT 0')
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_last_used ON {self.table} (last_used)')
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._db.execute(f'SELECT value, created FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if self.ttl is not None and now - row[1] > self.ttl:
+            self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            self._db.commit()
+            return None
+        self._db.execute(f'UPDATE {self.table} SET last_used = ? WHERE key = ?', (now, key))
+        self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        encoded = json.dumps(value)
+        now = time.time()
+        self._db.execute(
+            f'INSERT OR REPLACE INTO {self.table} (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)',
+            (key, encoded, len(encoded), now, now)
+        )
+        self._evict(now)
+        self._db.commit()
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self._db.execute(f'DELETE FROM {self.table} WHERE created < ?', (now - self.ttl,))
+        count, size = self._db.execute(f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}').fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+
+        removed = 0
+        for key, entry_size in self._db.execute(f'SELECT key, size FROM {self.table} ORDER BY last_used').fetchall():
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            count -= 1
+            size -= entry_size
+            removed += 1
+        print(self.eviction_message.format(removed), file=sys.stderr)
+
+    def clear(self):
+        self._db.execute(f'DELETE FROM {self.table}')
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+class ResponseCache(SqliteCache):
+    """Chat completion responses keyed by model, messages and sampling parameters.
+
+    Entries expire ``ttl`` seconds after they were stored and the least
+    recently used ones are evicted once the cache holds more than
+    ``max_entries`` responses or ``max_bytes`` of text.
+    """
+    table = 'responses'
+    eviction_message = "Evicted {} cached OpenAI responses"
+
+    def __init__(self, path: Optional[Path] = None, ttl: int = DEFAULT_TTL,
+                 max_entries: int = 50000, max_bytes: int = 128 * 1024 * 1024):
+        super().__init__(path or os.getenv('OPENAI_CACHE_PATH', DEFAULT_CACHE_PATH), max_entries, max_bytes, ttl)
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        request = {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens}
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
@@ -1,4 +1,8 @@
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
 import re
 from .types import VideoType, VideoMetadata, Signal, DetectionResult, CONFIDENCE_THRESHOLDS
 
@@ -65,13 +69,147 @@ def calculate_pattern_score(text: str, patterns: List[str]) -> Tuple[float, List
     # Normalize score to 0-1 range
     return min(total_score, 1.0), matches
 
+# Non-ASCII characters that re.IGNORECASE matches against ASCII letters (İ, ı, ſ, K)
+_ASCII_FOLDS = re.compile('[a-z]', re.IGNORECASE)
+
+def _literals(pattern: str) -> Optional[List[str]]:
+    """Every string a pattern of ASCII text, | and optional one-character classes can match, or None"""
+    results = []
+    for branch in pattern.split('|'):
+        options = ['']
+        i = 0
+        while i < len(branch):
+            char = branch[i]
+            if char == '[':
+                end = branch.find(']', i)
+                alternatives = list(branch[i + 1:end]) if end > i + 1 else None
+                if alternatives is None or any(c in '\\^-[' for c in alternatives):
+                    return None
+                i = end + 1
+            elif char in '\\.^$*+?{}()]' or not char.isascii():
+                return None
+            else:
+                alternatives = [char]
+                i += 1
+            if i < len(branch) and branch[i] == '?':
+                alternatives.append('')
+                i += 1
+            options = [option + alternative for option in options for alternative in alternatives]
+        results.extend(option.lower() for option in options)
+    return None if '' in results else results
+
+class PatternScanner:
+    """Every type's patterns for one metadata field, compiled into one scanner.
+    
+    Candidate positions, where at least one pattern matches, come from
+    str.find over the literal strings the patterns expand to, or from one
+    lookahead over the union of all patterns when they are not plain literal
+    alternations. A second regex, tried only at those positions, says which
+    patterns match there. Matches are then kept per pattern the way
+    re.findall would keep them (leftmost, non-overlapping), so scan() returns
+    exactly what calculate_pattern_score gives for each type. Patterns must
+    not contain capturing groups.
+    """
+    def __init__(self, patterns_by_type: Dict[VideoType, List[str]]):
+        self.entries = [
+            (video_type, pattern)
+            for video_type, patterns in patterns_by_type.items()
+            for pattern in patterns
+        ]
+        for _, pattern in self.entries:
+            if re.compile(pattern).groups:
+                raise ValueError(f"Pattern has capturing groups: {pattern}")
+        
+        self.types = list(patterns_by_type)
+        
+        # Literals sharing a shorter literal as prefix add no new start positions
+        expanded = [_literals(pattern) for _, pattern in self.entries]
+        self._literals = None
+        if all(literals is not None for literals in expanded):
+            literals = sorted({literal for group in expanded for literal in group}, key=len)
+            self._literals = []
+            for literal in literals:
+                if not any(literal.startswith(shorter) for shorter in self._literals):
+                    self._literals.append(literal)
+        self._starts = re.compile(
+            '(?=' + '|'.join(f'(?:{pattern})' for _, pattern in self.entries) + ')', re.IGNORECASE
+        )
+        self._groups = re.compile(
+            ''.join(f'(?:(?=({pattern}))|)' for _, pattern in self.entries), re.IGNORECASE
+        )
+    
+    def _positions(self, text: str) -> Iterable[int]:
+        # Plain substring search agrees with IGNORECASE on lowered text unless
+        # it holds one of the few non-ASCII characters that fold to ASCII
+        if self._literals is None or any(
+            _ASCII_FOLDS.match(char) for char in set(text) if not char.isascii()
+        ):
+            return (start.start() for start in self._starts.finditer(text))
+        
+        positions = set()
+        for literal in self._literals:
+            pos = text.find(literal)
+            while pos >= 0:
+                positions.add(pos)
+                pos = text.find(literal, pos + 1)
+        return sorted(positions)
+    
+    def scan(self, text: str) -> Dict[VideoType, Tuple[float, List[str]]]:
+        """Score and matches of every type's patterns in text."""
+        if not text or not self.entries:
+            return {video_type: (0.0, []) for video_type in self.types}
+        
+        text = text.lower()
+        found: List[List[str]] = [[] for _ in self.entries]
+        next_free = [0] * len(self.entries)
+        
+        for pos in self._positions(text):
+            spans = self._groups.match(text, pos).regs[1:]
+            for j, (begin, end) in enumerate(spans):
+                if begin >= 0 and pos >= next_free[j]:
+                    found[j].append(text[begin:end])
+                    next_free[j] = end if end > pos else pos + 1
+        
+        results = {}
+        j = 0
+        for video_type in self.types:
+            matches = []
+            total_score = 0.0
+            while j < len(self.entries) and self.entries[j][0] == video_type:
+                if found[j]:
+                    matches.extend(found[j])
+                    total_score += sum(len(match) / len(text) for match in found[j])
+                j += 1
+            results[video_type] = (min(total_score, 1.0), matches)
+        return results
+
+# Metadata field scanned for each PATTERNS key
+PATTERN_FIELDS = {'title': 'title', 'description': 'description', 'channel': 'channelTitle'}
+
+FIELD_SCANNERS = {
+    field: PatternScanner({video_type: patterns[field] for video_type, patterns in PATTERNS.items()})
+    for field in PATTERN_FIELDS
+}
+
+def score_fields(metadata: VideoMetadata) -> Dict[str, Dict[VideoType, Tuple[float, List[str]]]]:
+    """Pattern score and matches per field and type, one scan per field."""
+    return {field: FIELD_SCANNERS[field].scan(metadata[key]) for field, key in PATTERN_FIELDS.items()}
+
+def parse_duration(duration: str) -> int:
+    """Duration in seconds from YouTube's ISO 8601 form (PT1H2M3S) or H:MM:SS."""
+    iso = re.fullmatch(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration.strip())
+    if iso:
+        days, hours, minutes, seconds = (int(part or 0) for part in iso.groups())
+        return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+    
+    parts = duration.split(':')
+    return sum(int(part) * mult for part, mult in zip(reversed(parts), [1, 60, 3600]))
+
 def analyze_duration(duration: str) -> List[Signal]:
     """Analyze video duration for type signals."""
     signals = []
     
-    # Convert duration to seconds
-    parts = duration.split(':')
-    total_seconds = sum(int(part) * mult for part, mult in zip(reversed(parts), [1, 60, 3600]))
+    total_seconds = parse_duration(duration)
     
     # Add signals based on duration
     if total_seconds < 60:  # Under 1 minute
@@ -111,9 +249,10 @@ def detect_video_type(metadata: VideoMetadata) -> DetectionResult:
     type_scores: Dict[VideoType, float] = {t: 0.0 for t in VideoType}
     
     # Analyze each type's patterns
-    for video_type, patterns in PATTERNS.items():
+    field_scores = score_fields(metadata)
+    for video_type in PATTERNS:
         # Title analysis
-        title_score, title_matches = calculate_pattern_score(metadata['title'], patterns['title'])
+        title_score, title_matches = field_scores['title'][video_type]
         if title_score > 0:
             signals.append({
                 'source': 'title_pattern',
@@ -124,7 +263,7 @@ def detect_video_type(metadata: VideoMetadata) -> DetectionResult:
             type_scores[video_type] += title_score * 3
         
         # Description analysis
-        desc_score, desc_matches = calculate_pattern_score(metadata['description'], patterns['description'])
+        desc_score, desc_matches = field_scores['description'][video_type]
         if desc_score > 0:
             signals.append({
                 'source': 'description_pattern',
@@ -135,7 +274,7 @@ def detect_video_type(metadata: VideoMetadata) -> DetectionResult:
             type_scores[video_type] += desc_score * 2
         
         # Channel analysis
-        channel_score, channel_matches = calculate_pattern_score(metadata['channelTitle'], patterns['channel'])
+        channel_score, channel_matches = field_scores['channel'][video_type]
         if channel_score > 0:
             signals.append({
                 'source': 'channel_pattern',
@@ -166,3 +305,66 @@ def detect_video_type(metadata: VideoMetadata) -> DetectionResult:
         'needsAIVerification': confidence < CONFIDENCE_THRESHOLDS['HIGH'],
         'signals': signals
     }
+
+def _detect_chunk(chunk: List[VideoMetadata]) -> List[DetectionResult]:
+    return [detect_video_type(metadata) for metadata in chunk]
+
+def map_chunks(
+    function: Callable[[List[Any]], List[Any]],
+    items: Iterable[Any],
+    workers: Optional[int] = None,
+    chunk_size: int = 256
+) -> Iterator[Any]:
+    """Apply function to chunks of items in a process pool, yielding its results in input order.
+    
+    Items are read lazily, ``chunk_size`` at a time, and at most two chunks
+    per worker are in flight, so memory stays bounded however long the input.
+    ``function`` must be picklable, i.e. defined at module level.
+    """
+    workers = workers or os.cpu_count() or 1
+    iterator = iter(items)
+    chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+    if workers == 1:
+        for chunk in chunks:
+            yield from function(chunk)
+        return
+    
+    pool = ProcessPoolExecutor(workers)
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(function, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def detect_video_types(
+    metadata: Iterable[VideoMetadata],
+    workers: Optional[int] = None,
+    chunk_size: int = 256
+) -> Iterator[DetectionResult]:
+    """Detect types for many videos in ``workers`` processes (one per CPU by default), in input order."""
+    return map_chunks(_detect_chunk, metadata, workers, chunk_size)
+
+def rank_candidate_types(detection: DetectionResult, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Candidate types for AI verification, best first.
+    
+    Scores are the summed signal scores per type; the detected type always
+    leads so the pattern-based choice is the first one verified or analyzed.
+    """
+    scores: Dict[VideoType, float] = {}
+    for signal in detection['signals']:
+        if signal.get('type') is not None:
+            video_type = VideoType(signal['type'])
+            scores[video_type] = scores.get(video_type, 0.0) + signal['score']
+    
+    detected_type = VideoType(detection['type'])
+    ranked = sorted(scores.items(), key=lambda x: (x[0] != detected_type, -x[1]))
+    if detected_type not in scores:
+        ranked.insert(0, (detected_type, 0.0))
+    
+    candidates = [{'type': video_type, 'score': score} for video_type, score in ranked]
+    return candidates[:limit] if limit is not None else candidates
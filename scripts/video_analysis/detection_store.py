@@ -0,0 +1,140 @@
+"""Persistent per-video record of detection and AI verification results."""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .types import VideoType, VideoMetadata, DetectionResult
+from .detection import PATTERNS, detect_video_type
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'detections.sqlite'
+
+# Metadata fields detection and verification prompts look at
+FINGERPRINT_FIELDS = ('title', 'description', 'channelTitle', 'duration')
+
+def metadata_fingerprint(metadata: VideoMetadata) -> str:
+    fields = {field: metadata.get(field, '') for field in FINGERPRINT_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# Stored detections are recomputed once the pattern rules change
+RULES_FINGERPRINT = hashlib.sha256(json.dumps(
+    {str(video_type): patterns for video_type, patterns in PATTERNS.items()}, sort_keys=True
+).encode('utf-8')).hexdigest()[:16]
+
+def _decode_detection(value: str) -> DetectionResult:
+    detection = json.loads(value)
+    detection['type'] = VideoType(detection['type'])
+    for signal in detection['signals']:
+        if signal.get('type') is not None:
+            signal['type'] = VideoType(signal['type'])
+    return detection
+
+class DetectionStore:
+    """sqlite store of the latest DetectionResult and verified type per videoId.
+
+    Each row keeps a fingerprint of the metadata it was computed from; a
+    lookup that passes current metadata ignores rows whose fingerprint no
+    longer matches, so edited titles or descriptions are classified again.
+    """
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else Path(os.getenv('DETECTION_STORE_PATH', DEFAULT_STORE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS detections ('
+            'video_id TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, rules TEXT, detection TEXT, '
+            'verified_type TEXT, verified_confidence REAL, updated REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS detections_confidence ON detections (verified_confidence)')
+        self._db.commit()
+
+    def _record(self, row) -> Dict[str, Any]:
+        video_id, fingerprint, rules, detection, verified_type, verified_confidence, updated = row
+        detection = _decode_detection(detection) if detection and rules == RULES_FINGERPRINT else None
+        record = {
+            'videoId': video_id,
+            'fingerprint': fingerprint,
+            'detection': detection,
+            'verifiedType': VideoType(verified_type) if verified_type else None,
+            'verifiedConfidence': verified_confidence,
+            'updated': updated
+        }
+        # Final answer: the verified type when there is one, else the detected type
+        if record['verifiedType'] is not None:
+            record['type'], record['confidence'] = record['verifiedType'], verified_confidence
+        elif detection is not None:
+            record['type'], record['confidence'] = detection['type'], detection['confidence']
+        else:
+            record['type'], record['confidence'] = None, None
+        return record
+
+    def get(self, video_id: str, metadata: Optional[VideoMetadata] = None) -> Optional[Dict[str, Any]]:
+        """Stored record for a video, or None if missing or computed from other metadata"""
+        return self.get_many([video_id], [metadata] if metadata else None).get(video_id)
+
+    def get_many(self, video_ids: Iterable[str],
+                 metadata: Optional[List[VideoMetadata]] = None) -> Dict[str, Dict[str, Any]]:
+        """Stored records by videoId; pass metadata (same order as the IDs) to drop stale ones"""
+        video_ids = list(video_ids)
+        fingerprints = {}
+        if metadata is not None:
+            fingerprints = {video_id: metadata_fingerprint(m) for video_id, m in zip(video_ids, metadata)}
+
+        records = {}
+        for start in range(0, len(video_ids), 500):
+            chunk = video_ids[start:start + 500]
+            rows = self._db.execute(
+                'SELECT video_id, fingerprint, rules, detection, verified_type, verified_confidence, updated '
+                f"FROM detections WHERE video_id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for row in rows:
+                if row[0] in fingerprints and fingerprints[row[0]] != row[1]:
+                    continue
+                records[row[0]] = self._record(row)
+        return records
+
+    def _upsert(self, metadata: VideoMetadata, **columns):
+        """Update a row, clearing everything else in it when the metadata changed"""
+        fingerprint = metadata_fingerprint(metadata)
+        row = self._db.execute('SELECT fingerprint FROM detections WHERE video_id = ?', (metadata['videoId'],)).fetchone()
+        if row is None or row[0] != fingerprint:
+            self._db.execute(
+                'INSERT OR REPLACE INTO detections (video_id, fingerprint, updated) VALUES (?, ?, ?)',
+                (metadata['videoId'], fingerprint, time.time())
+            )
+        assignments = ', '.join(f'{column} = ?' for column in columns)
+        self._db.execute(
+            f'UPDATE detections SET {assignments}, updated = ? WHERE video_id = ?',
+            (*columns.values(), time.time(), metadata['videoId'])
+        )
+        self._db.commit()
+
+    def put_detection(self, metadata: VideoMetadata, detection: DetectionResult):
+        self._upsert(metadata, rules=RULES_FINGERPRINT, detection=json.dumps(detection))
+
+    def put_verification(self, metadata: VideoMetadata, video_type: VideoType, confidence: float):
+        self._upsert(metadata, verified_type=str(video_type), verified_confidence=confidence)
+
+    def detect(self, metadata: VideoMetadata) -> DetectionResult:
+        """detect_video_type, reusing the stored result for unchanged metadata"""
+        record = self.get(metadata['videoId'], metadata)
+        if record is not None and record['detection'] is not None:
+            return record['detection']
+        detection = detect_video_type(metadata)
+        self.put_detection(metadata, detection)
+        return detection
+
+    def low_confidence(self, threshold: float, limit: int = 100) -> List[str]:
+        """Videos whose verified confidence is below threshold, least confident first"""
+        rows = self._db.execute(
+            'SELECT video_id FROM detections WHERE verified_confidence < ? ORDER BY verified_confidence LIMIT ?',
+            (threshold, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,190 @@
+"""Nearest-centroid video type classifier on sentence embeddings.
+
+Each VideoType has a few prototype descriptions; their normalized mean
+embedding is the type's centroid. A video's title and description are
+embedded with the same all-MiniLM-L6-v2 model SmartPreprocessor uses and
+scored by cosine similarity to every centroid. Centroids are cached on disk,
+keyed by model and prototype texts, so only the video itself is encoded.
+"""
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .types import VideoType, VideoMetadata, DetectionResult, CONFIDENCE_THRESHOLDS, VIDEO_TEMPLATES
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'classifier'
+
+# Title and description are cut to roughly what the model reads (256 word pieces)
+MAX_TEXT_CHARS = 1200
+
+# Softmax temperature for turning cosine similarities into confidences
+TEMPERATURE = 0.05
+
+# Margin between the best and second-best similarity that settles a video without the API
+DEFAULT_MIN_MARGIN = float(os.getenv('EMBEDDING_CLASSIFIER_MIN_MARGIN', '0.08'))
+
+TYPE_PROTOTYPES = {
+    VideoType.TUTORIAL: [
+        'Step by step programming tutorial with code examples',
+        'Learn how to use this software: a complete beginner guide and walkthrough',
+        'Getting started with a framework, setting up the project and building the first feature',
+        'Technical tutorial explaining tools, prerequisites and each step of the process'
+    ],
+    VideoType.HOWTO: [
+        'How to make it at home: materials needed and easy steps',
+        'DIY project: build, fix or repair it yourself with simple tools',
+        'Recipe with ingredients and cooking instructions',
+        'Quick practical guide with tips and safety considerations'
+    ],
+    VideoType.EDUCATIONAL: [
+        'Lecture explaining a science concept and the theory behind it',
+        'Lesson on history, math or physics for students',
+        'What is it and why does it happen, explained simply',
+        'Course covering fundamental principles and learning objectives'
+    ],
+    VideoType.REVIEW: [
+        'Product review with pros and cons and a final verdict',
+        'Is it worth buying? Honest review and comparison with alternatives',
+        'Unboxing and hands-on testing of a new device',
+        'Rating and recommendation after using the product for a month'
+    ],
+    VideoType.COMMENTARY: [
+        'Opinion and commentary on current events and culture',
+        'Podcast episode discussing ideas, arguments and different perspectives',
+        'Reaction and analysis of a controversial topic',
+        'Interview and conversation about business, startups and trends'
+    ],
+    VideoType.ENTERTAINMENT: [
+        'Funny sketch comedy and entertaining challenge video',
+        'Music video, gaming highlights and fun moments',
+        'Prank, vlog-style entertainment with humor and drama',
+        'Short clips and highlights for entertainment'
+    ],
+    VideoType.NEWS: [
+        'Breaking news report and latest updates',
+        'News coverage of announcements, politics and world events',
+        'Daily news roundup of what happened this week',
+        'Press conference and official announcement coverage'
+    ],
+    VideoType.VLOG: [
+        'A day in my life vlog',
+        'Travel vlog following my trip and personal experiences',
+        'Personal update and behind the scenes of my week',
+        'Come with me: daily routine vlog'
+    ]
+}
+
+def video_text(metadata: VideoMetadata) -> str:
+    return f"{metadata['title']}\n{metadata['description']}"[:MAX_TEXT_CHARS]
+
+class EmbeddingClassifier:
+    """Scores videos against per-type prototype centroids.
+
+    The sentence model is loaded on first use; pass ``encode`` (a function
+    from a list of texts to normalized embeddings) to share an already
+    loaded model.
+    """
+    def __init__(self, encode=None, cache_dir: Optional[Path] = None,
+                 prototypes: Optional[Dict[VideoType, List[str]]] = None):
+        self._encode = encode
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.prototypes = prototypes or TYPE_PROTOTYPES
+        self.types = list(self.prototypes)
+        self._centroids = None
+
+    def encode(self, texts: List[str]):
+        if self._encode is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(MODEL_NAME)
+            self._encode = lambda batch: model.encode(batch, batch_size=32, normalize_embeddings=True)
+        return self._encode(texts)
+
+    @property
+    def centroids(self):
+        """One normalized centroid per type, loaded from disk when the prototypes are unchanged"""
+        import numpy as np
+        if self._centroids is not None:
+            return self._centroids
+
+        key = hashlib.sha256(json.dumps(
+            {'model': MODEL_NAME, 'prototypes': {str(t): texts for t, texts in self.prototypes.items()}},
+            sort_keys=True
+        ).encode('utf-8')).hexdigest()[:16]
+        path = self.cache_dir / f'prototypes-{key}.npy'
+        if path.exists():
+            self._centroids = np.load(path)
+            return self._centroids
+
+        print("Computing video type prototype embeddings...", file=sys.stderr)
+        centroids = []
+        for video_type in self.types:
+            mean = np.asarray(self.encode(self.prototypes[video_type]), dtype=np.float32).mean(axis=0)
+            centroids.append(mean / np.linalg.norm(mean))
+        self._centroids = np.stack(centroids)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        np.save(path, self._centroids)
+        return self._centroids
+
+    def classify_many(self, metadata_list: Iterable[VideoMetadata]) -> List[Dict[str, Any]]:
+        """Best type, softmax confidence, similarity margin and per-type similarities for each video"""
+        import numpy as np
+        texts = [video_text(metadata) for metadata in metadata_list]
+        if not texts:
+            return []
+        similarities = np.asarray(self.encode(texts), dtype=np.float32) @ self.centroids.T
+
+        results = []
+        for row in similarities:
+            order = np.argsort(row)[::-1]
+            weights = np.exp((row - row[order[0]]) / TEMPERATURE)
+            results.append({
+                'type': self.types[order[0]],
+                'confidence': float(weights[order[0]] / weights.sum()),
+                'margin': float(row[order[0]] - row[order[1]]) if len(order) > 1 else 1.0,
+                'similarities': {str(self.types[i]): float(row[i]) for i in order}
+            })
+        return results
+
+    def classify(self, metadata: VideoMetadata) -> Dict[str, Any]:
+        return self.classify_many([metadata])[0]
+
+def refine_detection(
+    detection: DetectionResult,
+    classification: Dict[str, Any],
+    min_margin: float = DEFAULT_MIN_MARGIN
+) -> DetectionResult:
+    """Combine pattern detection with the embedding classifier.
+
+    The classifier's result is added as an ``embedding`` signal. A detection
+    that needed AI verification is settled locally when the classifier is
+    clear-cut (its margin reaches ``min_margin``), or when it agrees with the
+    pattern-based type with at least medium confidence. Only types with a
+    VIDEO_TEMPLATES entry are settled, since analysis and summary prompts need
+    one; everything else still goes to verify_video_type.
+    """
+    signals = detection['signals'] + [{
+        'source': 'embedding',
+        'score': classification['confidence'],
+        'reason': f"Nearest prototype {classification['type']} (margin {classification['margin']:.3f})",
+        'type': classification['type']
+    }]
+    if not detection['needsAIVerification']:
+        return {**detection, 'signals': signals}
+
+    agrees = classification['type'] == detection['type']
+    templated = str(classification['type']) in VIDEO_TEMPLATES
+    if templated and (classification['margin'] >= min_margin or (
+        agrees and classification['confidence'] >= CONFIDENCE_THRESHOLDS['MEDIUM']
+    )):
+        return {
+            'type': classification['type'],
+            'confidence': max(classification['confidence'], detection['confidence'] if agrees else 0.0),
+            'needsAIVerification': False,
+            'signals': signals
+        }
+    return {**detection, 'signals': signals}
@@ -0,0 +1,71 @@
+"""Incremental parsing of a streamed JSON object."""
+import json
+from typing import Any, Dict, List, Tuple
+
+class JsonObjectStream:
+    """Parses one JSON object fed in pieces, returning top-level members as they complete.
+
+    Text before the opening brace (such as a Markdown code fence) is skipped.
+    A member is returned once the comma or closing brace after its value
+    arrives, so nested values come back whole.
+    """
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self._buffer += text
+        members = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and not self.done:
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._start = i + 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._members(buffer[self._start:i]))
+                    self.done = True
+            elif ch == ',' and self._depth == 1:
+                members.extend(self._members(buffer[self._start:i]))
+                self._start = i + 1
+            i += 1
+
+        # Drop what has been consumed so the buffer only holds the open member
+        self._buffer = buffer[self._start:] if not self.done else ''
+        self._pos = i - self._start if not self.done else 0
+        self._start = 0
+        return members
+
+    @staticmethod
+    def _members(text: str) -> List[Tuple[str, Any]]:
+        if not text.strip():
+            return []
+        return list(json.loads('{' + text + '}').items())
+
+def loads_object(text: str) -> Dict[str, Any]:
+    """Parse a complete response the way JsonObjectStream reads it, skipping text around the object"""
+    parser = JsonObjectStream()
+    members = parser.feed(text)
+    if not parser.done:
+        raise ValueError("Incomplete JSON object in response")
+    return dict(members)
@@ -1,140 +1,326 @@
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable, AsyncIterator, FrozenSet
 import os
 import json
+import asyncio
+import weakref
+from functools import lru_cache
+import httpx
 import openai
-from .types import VideoType, VideoMetadata, VIDEO_TEMPLATES, TYPE_FOCUS, CONFIDENCE_THRESHOLDS
+from .types import VideoType, VideoMetadata, DetectionResult, VIDEO_TEMPLATES, TYPE_FOCUS, CONFIDENCE_THRESHOLDS
+from .detection import detect_video_type, rank_candidate_types
+from .detection_store import DetectionStore
+from .embedding_classifier import EmbeddingClassifier, refine_detection
+from .cache import ResponseCache
+from .rate_limit import get_rate_limiter
+from .tokens import PROMPT_BUDGETS, count_message_tokens, fit_to_budget, get_usage_tracker
+from .json_stream import JsonObjectStream, loads_object
 
-def get_openai_client():
-    """Initialize OpenAI client."""
+# Connection pool shared by every request made through get_openai_client()
+MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+
+# One client per event loop: its pooled connections belong to the loop that opened them
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, openai.AsyncOpenAI]' = weakref.WeakKeyDictionary()
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """Shared async OpenAI client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is not None:
+        return client
+    
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable not set")
     
     org_id = os.getenv('OPENAI_ORGANIZATION_ID')
-    client = openai.OpenAI(
+    client = openai.AsyncOpenAI(
         api_key=api_key,
-        organization=org_id
+        organization=org_id,
+        # Retries go through the shared rate limiter instead
+        max_retries=0,
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        )
     )
+    _clients[loop] = client
     return client
 
+async def close_openai_client():
+    """Close the running loop's shared client, e.g. before the loop shuts down."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Shared response cache, or None when OPENAI_RESPONSE_CACHE=0."""
+    global _response_cache
+    if os.getenv('OPENAI_RESPONSE_CACHE', '1') == '0':
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+async def _chat_completion(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    model: str = 'gpt-4',
+    use_cache: bool = True,
+    validate: Optional[Callable[[str], Any]] = None,
+    call_type: str = 'chat'
+) -> Dict[str, Any]:
+    """Run a chat completion, reusing a cached response for identical requests.
+    
+    Uncached requests wait for the shared rate limiter, which retries rate
+    limits and transient errors. Returns the message content and finish
+    reason. ``validate`` is called on the content before it is cached so
+    unusable responses are not kept. Token usage is recorded under ``call_type``.
+    """
+    cache = get_response_cache() if use_cache else None
+    key = ResponseCache.make_key(model, messages, temperature, max_tokens) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            get_usage_tracker().record(call_type, model, cached=True)
+            return cached
+    
+    prompt_tokens = count_message_tokens(messages, model)
+    client = get_openai_client()
+    completion = await get_rate_limiter().run(
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        ),
+        prompt_tokens + max_tokens
+    )
+    get_usage_tracker().record(call_type, model, completion.usage, prompt_tokens)
+    response = {
+        'content': completion.choices[0].message.content,
+        'finish_reason': completion.choices[0].finish_reason
+    }
+    if validate:
+        validate(response['content'])
+    if cache:
+        cache.put(key, response)
+    return response
+
+async def _stream_chat_completion(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    model: str = 'gpt-4',
+    use_cache: bool = True,
+    validate: Optional[Callable[[str], Any]] = None,
+    call_type: str = 'chat'
+) -> AsyncIterator[str]:
+    """Streaming counterpart of _chat_completion, yielding content as it arrives.
+    
+    A cached response is yielded in one piece; a streamed one is cached once
+    it has finished and passed ``validate``.
+    """
+    cache = get_response_cache() if use_cache else None
+    key = ResponseCache.make_key(model, messages, temperature, max_tokens) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            get_usage_tracker().record(call_type, model, cached=True)
+            yield cached['content']
+            return
+    
+    prompt_tokens = count_message_tokens(messages, model)
+    client = get_openai_client()
+    stream = await get_rate_limiter().run(
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={'include_usage': True}
+        ),
+        prompt_tokens + max_tokens
+    )
+    parts = []
+    finish_reason = None
+    usage = None
+    try:
+        async for chunk in stream:
+            # The final chunk carries usage and no choices
+            usage = getattr(chunk, 'usage', None) or usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+                yield choice.delta.content
+            finish_reason = choice.finish_reason or finish_reason
+    finally:
+        await stream.close()
+    get_usage_tracker().record(call_type, model, usage, prompt_tokens)
+    
+    content = ''.join(parts)
+    if validate:
+        validate(content)
+    if cache:
+        cache.put(key, {'content': content, 'finish_reason': finish_reason})
+
+VERIFICATION_PROMPT_HEADER = (
+    "You are a specialized video content classifier. Analyze this video content and determine its type.\n"
+    "Choose ONLY from these specific content types, with their exact schema requirements:\n\n"
+)
+VERIFICATION_PROMPT_FOOTER = "Respond ONLY with the type name that best matches this content, nothing else.\n\n"
+
+def _compile_prompts() -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    """Render the static part of every prompt once per video type.
+    
+    Everything that does not depend on the video comes first so repeated
+    calls share the longest possible prefix, which providers cache.
+    """
+    verification_blocks, analysis_prefixes, summary_prefixes = {}, {}, {}
+    for video_type, config in VIDEO_TEMPLATES.items():
+        schema = json.dumps(config['template'], indent=2)
+        verification_blocks[video_type] = (
+            f"Type: {video_type}\n"
+            f"System Context: {config['systemPrompt']}\n"
+            f"Schema:\n{schema}\n\n"
+        )
+        analysis_prefixes[video_type] = (
+            f"{config['systemPrompt']}\n\n"
+            "Your task is to analyze this video content and generate a structured analysis following this exact schema:\n"
+            f"{schema}\n\n"
+            "Respond ONLY with a valid JSON object matching the schema above. Do not include any other text.\n\n"
+        )
+        summary = f"{config['systemPrompt']}\n\nSummarize this {video_type} video in a clear and concise way.\n\n"
+        if video_type in TYPE_FOCUS:
+            summary += "Focus on these key aspects:\n"
+            summary += ''.join(f"- {point}\n" for point in TYPE_FOCUS[video_type])
+            summary += "\n"
+        summary_prefixes[video_type] = summary + "Keep the summary under 200 words.\n\n"
+    return verification_blocks, analysis_prefixes, summary_prefixes
+
+VERIFICATION_TYPE_BLOCKS, ANALYSIS_PROMPT_PREFIXES, SUMMARY_PROMPT_PREFIXES = _compile_prompts()
+
+@lru_cache(maxsize=None)
+def _verification_prefix(video_types: FrozenSet[str]) -> str:
+    # Canonical template order, so the same candidates always give the same prefix
+    blocks = ''.join(block for video_type, block in VERIFICATION_TYPE_BLOCKS.items() if video_type in video_types)
+    return VERIFICATION_PROMPT_HEADER + blocks + VERIFICATION_PROMPT_FOOTER
+
+def _video_information(metadata: VideoMetadata) -> str:
+    return (
+        "Video Information:\n"
+        f"Title: {metadata['title']}\n"
+        f"Description: {metadata['description']}\n"
+        f"Duration: {metadata['duration']}\n"
+        f"Channel: {metadata['channelTitle']}\n"
+    )
+
 def generate_type_verification_prompt(
     metadata: VideoMetadata,
     possible_types: List[Dict[str, Any]]
 ) -> str:
     """Generate prompt for type verification."""
-    # Get templates for possible types
-    type_templates = []
-    for type_info in possible_types:
-        video_type = type_info['type']
-        if isinstance(video_type, VideoType):
-            video_type = str(video_type)
-            
-        if video_type in VIDEO_TEMPLATES:
-            config = VIDEO_TEMPLATES[video_type]
-            type_templates.append({
-                'type': video_type,
-                'template': json.dumps(config['template'], indent=2),
-                'systemPrompt': config['systemPrompt']
-            })
-    
-    # Build prompt
-    prompt = "You are a specialized video content classifier. Analyze this video content and determine its type.\n"
-    prompt += "Choose ONLY from these specific content types, with their exact schema requirements:\n\n"
-    
-    for template in type_templates:
-        prompt += f"Type: {template['type']}\n"
-        prompt += f"System Context: {template['systemPrompt']}\n"
-        prompt += f"Schema:\n{template['template']}\n\n"
-    
-    prompt += f"Video Information:\n"
-    prompt += f"Title: {metadata['title']}\n"
-    prompt += f"Description: {metadata['description']}\n"
-    prompt += f"Duration: {metadata['duration']}\n"
-    prompt += f"Channel: {metadata['channelTitle']}\n\n"
-    
-    prompt += "Respond ONLY with the type name that best matches this content, nothing else."
-    
-    return prompt
+    video_types = frozenset(str(type_info['type']) for type_info in possible_types)
+    return _verification_prefix(video_types) + _video_information(metadata)
 
 def generate_analysis_prompt(
     metadata: VideoMetadata,
     detected_type: VideoType
 ) -> str:
     """Generate prompt for detailed analysis."""
-    video_type = str(detected_type)
-    config = VIDEO_TEMPLATES[video_type]
-    
-    prompt = f"{config['systemPrompt']}\n\n"
-    prompt += "Your task is to analyze this video content and generate a structured analysis following this exact schema:\n"
-    prompt += json.dumps(config['template'], indent=2) + "\n\n"
-    
-    prompt += f"Video Information:\n"
-    prompt += f"Title: {metadata['title']}\n"
-    prompt += f"Description: {metadata['description']}\n"
-    prompt += f"Duration: {metadata['duration']}\n"
-    prompt += f"Channel: {metadata['channelTitle']}\n\n"
-    
-    prompt += "Respond ONLY with a valid JSON object matching the schema above. Do not include any other text."
-    
-    return prompt
+    return ANALYSIS_PROMPT_PREFIXES[str(detected_type)] + _video_information(metadata)
 
 def generate_summary_prompt(
     metadata: VideoMetadata,
     detected_type: VideoType
 ) -> str:
     """Generate prompt for video summary."""
-    video_type = str(detected_type)
-    config = VIDEO_TEMPLATES[video_type]
-    
-    prompt = f"{config['systemPrompt']}\n\n"
-    prompt += f"Summarize this {video_type} video in a clear and concise way.\n\n"
-    
-    prompt += f"Video Information:\n"
-    prompt += f"Title: {metadata['title']}\n"
-    prompt += f"Description: {metadata['description']}\n"
-    prompt += f"Duration: {metadata['duration']}\n"
-    prompt += f"Channel: {metadata['channelTitle']}\n\n"
-    
-    if video_type in TYPE_FOCUS:
-        focus_points = TYPE_FOCUS[video_type]
-        prompt += "Focus on these key aspects:\n"
-        for point in focus_points:
-            prompt += f"- {point}\n"
-    
-    prompt += "\nKeep the summary under 200 words."
+    return SUMMARY_PROMPT_PREFIXES[str(detected_type)] + _video_information(metadata)
+
+def verification_request(metadata: VideoMetadata, possible_types: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Chat completion parameters for type verification, trimmed to its prompt budget."""
+    def build(metadata: VideoMetadata) -> Dict[str, Any]:
+        return {
+            'model': 'gpt-4',
+            'messages': [
+                {
+                    'role': 'system',
+                    'content': 'You are a specialized video content classifier. Respond ONLY with the exact type name that best matches the content.'
+                },
+                {
+                    'role': 'user',
+                    'content': generate_type_verification_prompt(metadata, possible_types)
+                }
+            ],
+            'temperature': 0.3,
+            'max_tokens': 10
+        }
     
-    return prompt
+    return fit_to_budget(build, metadata, PROMPT_BUDGETS['verification'])
 
-async def verify_video_type(
-    metadata: VideoMetadata,
-    possible_types: List[Dict[str, Any]]
-) -> Tuple[VideoType, float]:
-    """Verify video type using OpenAI."""
-    client = get_openai_client()
+def analysis_request(metadata: VideoMetadata, detected_type: VideoType) -> Dict[str, Any]:
+    """Chat completion parameters for detailed analysis, trimmed to its prompt budget."""
+    def build(metadata: VideoMetadata) -> Dict[str, Any]:
+        return {
+            'model': 'gpt-4',
+            'messages': [
+                {
+                    'role': 'system',
+                    'content': 'You are a specialized video content analyzer. Generate a structured analysis following the exact schema provided.'
+                },
+                {
+                    'role': 'user',
+                    'content': generate_analysis_prompt(metadata, detected_type)
+                }
+            ],
+            'temperature': 0.7,
+            'max_tokens': 2000
+        }
     
-    try:
-        prompt = generate_type_verification_prompt(metadata, possible_types)
-        
-        completion = client.chat.completions.create(
-            model='gpt-4',
-            messages=[
+    return fit_to_budget(build, metadata, PROMPT_BUDGETS['analysis'])
+
+def summary_request(metadata: VideoMetadata, detected_type: VideoType) -> Dict[str, Any]:
+    """Chat completion parameters for video summary, trimmed to its prompt budget."""
+    def build(metadata: VideoMetadata) -> Dict[str, Any]:
+        return {
+            'model': 'gpt-4',
+            'messages': [
                 {
                     'role': 'system',
-                    'content': 'You are a specialized video content classifier. Respond ONLY with the exact type name that best matches the content.'
+                    'content': 'You are a specialized video content summarizer. Generate a clear, concise summary focusing on the most relevant aspects for this type of content.'
                 },
                 {
                     'role': 'user',
-                    'content': prompt
+                    'content': generate_summary_prompt(metadata, detected_type)
                 }
             ],
-            temperature=0.3,
-            max_tokens=10
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
+    
+    return fit_to_budget(build, metadata, PROMPT_BUDGETS['summary'])
+
+async def verify_video_type(
+    metadata: VideoMetadata,
+    possible_types: List[Dict[str, Any]],
+    use_cache: bool = True
+) -> Tuple[VideoType, float]:
+    """Verify video type using OpenAI."""
+    try:
+        completion = await _chat_completion(
+            **verification_request(metadata, possible_types),
+            use_cache=use_cache,
+            call_type='verification'
         )
 
-        detected_type = completion.choices[0].message.content.strip().lower()
+        detected_type = completion['content'].strip().lower()
         
         # Calculate confidence based on token probabilities or use default
-        confidence = 0.85 if completion.choices[0].finish_reason == 'stop' else 0.7
+        confidence = 0.85 if completion['finish_reason'] == 'stop' else 0.7
         
         return VideoType(detected_type), confidence
         
@@ -145,31 +331,19 @@ async def verify_video_type(
 
 async def generate_video_analysis(
     metadata: VideoMetadata,
-    detected_type: VideoType
+    detected_type: VideoType,
+    use_cache: bool = True
 ) -> Dict[str, Any]:
     """Generate detailed video analysis using OpenAI."""
-    client = get_openai_client()
-    
     try:
-        prompt = generate_analysis_prompt(metadata, detected_type)
-        
-        completion = client.chat.completions.create(
-            model='gpt-4',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a specialized video content analyzer. Generate a structured analysis following the exact schema provided.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=2000
+        completion = await _chat_completion(
+            **analysis_request(metadata, detected_type),
+            use_cache=use_cache,
+            validate=loads_object,
+            call_type='analysis'
         )
 
-        return json.loads(completion.choices[0].message.content)
+        return loads_object(completion['content'])
         
     except Exception as e:
         print(f"Error generating video analysis: {e}")
@@ -180,32 +354,155 @@ async def generate_video_analysis(
 
 async def generate_video_summary(
     metadata: VideoMetadata,
-    detected_type: VideoType
+    detected_type: VideoType,
+    use_cache: bool = True
 ) -> str:
     """Generate video summary using OpenAI."""
-    client = get_openai_client()
-    
     try:
-        prompt = generate_summary_prompt(metadata, detected_type)
-        
-        completion = client.chat.completions.create(
-            model='gpt-4',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a specialized video content summarizer. Generate a clear, concise summary focusing on the most relevant aspects for this type of content.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=500
+        completion = await _chat_completion(
+            **summary_request(metadata, detected_type),
+            use_cache=use_cache,
+            call_type='summary'
         )
 
-        return completion.choices[0].message.content.strip()
+        return completion['content'].strip()
         
     except Exception as e:
         print(f"Error generating video summary: {e}")
         return 'Failed to generate video summary'
+
+async def stream_video_analysis(
+    metadata: VideoMetadata,
+    detected_type: VideoType,
+    use_cache: bool = True
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream the analysis as (key, value) pairs, one per top-level field as it completes.
+    
+    On failure the same fields as generate_video_analysis's fallback are
+    yielded, so a consumer building a dict ends up with an ``error`` key.
+    """
+    parser = JsonObjectStream()
+    
+    def check_complete(content: Optional[str] = None):
+        # Every chunk has been through the parser by the time the stream validates
+        if not parser.done:
+            raise ValueError("Incomplete JSON object in response")
+    
+    try:
+        async for text in _stream_chat_completion(
+            **analysis_request(metadata, detected_type),
+            use_cache=use_cache,
+            validate=check_complete,
+            call_type='analysis'
+        ):
+            for member in parser.feed(text):
+                yield member
+        check_complete()
+        
+    except Exception as e:
+        print(f"Error generating video analysis: {e}")
+        yield 'error', 'Failed to generate video analysis'
+        yield 'type', str(detected_type)
+
+async def stream_video_summary(
+    metadata: VideoMetadata,
+    detected_type: VideoType,
+    use_cache: bool = True
+) -> AsyncIterator[str]:
+    """Stream the video summary text as it is generated.
+    
+    If the call fails before any text arrives the fallback message is
+    yielded instead; a failure part way through ends the stream early.
+    """
+    started = False
+    try:
+        async for text in _stream_chat_completion(
+            **summary_request(metadata, detected_type),
+            use_cache=use_cache,
+            call_type='summary'
+        ):
+            # Match generate_video_summary, which strips the whole summary
+            if not started:
+                text = text.lstrip()
+                if not text:
+                    continue
+                started = True
+            yield text
+        
+    except Exception as e:
+        print(f"Error generating video summary: {e}")
+        if not started:
+            yield 'Failed to generate video summary'
+
+async def analyze_video(
+    metadata: VideoMetadata,
+    detection: Optional[DetectionResult] = None,
+    speculative_types: int = 1,
+    use_cache: bool = True,
+    store: Optional[DetectionStore] = None,
+    classifier: Optional[EmbeddingClassifier] = None
+) -> Dict[str, Any]:
+    """Verify, analyze and summarize one video with the calls overlapped.
+    
+    When detection needs AI verification, analysis and summary for the top
+    ``speculative_types`` candidates start alongside verify_video_type; the
+    ones for types that lose are cancelled once verification returns. If
+    verification picks a type that was not speculated on, its calls start then.
+    
+    Without ``detection`` the video is detected here. With a ``store``, a
+    stored detection and verified type for unchanged metadata are reused and
+    new verifications are recorded. With a ``classifier``, a detection that
+    still needs verification goes through refine_detection first and skips
+    the API when the embedding classifier settles it.
+    """
+    if detection is None:
+        detection = store.detect(metadata) if store else detect_video_type(metadata)
+    verified = False
+    if store and detection['needsAIVerification']:
+        record = store.get(metadata['videoId'], metadata)
+        if record and record['verifiedType'] is not None:
+            detection = {**detection, 'type': record['verifiedType'],
+                         'confidence': record['verifiedConfidence'], 'needsAIVerification': False}
+            verified = True
+    if classifier is not None and detection['needsAIVerification']:
+        # Encoding is CPU-bound; keep it off the event loop
+        classification = await asyncio.to_thread(classifier.classify, metadata)
+        detection = refine_detection(detection, classification)
+    
+    candidates = rank_candidate_types(detection)
+    detected_type = VideoType(detection['type'])
+    confidence = detection['confidence']
+    
+    def start(video_type: VideoType) -> Tuple[asyncio.Task, asyncio.Task]:
+        return (
+            asyncio.create_task(generate_video_analysis(metadata, video_type, use_cache=use_cache)),
+            asyncio.create_task(generate_video_summary(metadata, video_type, use_cache=use_cache))
+        )
+    
+    if not detection['needsAIVerification']:
+        analysis, summary = await asyncio.gather(*start(detected_type))
+        return {'type': detected_type, 'confidence': confidence, 'verified': verified,
+                'analysis': analysis, 'summary': summary}
+    
+    speculative = {candidate['type']: start(candidate['type'])
+                   for candidate in candidates[:max(speculative_types, 0)]}
+    try:
+        detected_type, confidence = await verify_video_type(metadata, candidates, use_cache=use_cache)
+    except BaseException:
+        for tasks in speculative.values():
+            for task in tasks:
+                task.cancel()
+        raise
+    # verify_video_type falls back to MEDIUM confidence after an API error; don't keep those
+    verified = confidence > CONFIDENCE_THRESHOLDS['MEDIUM']
+    if store and verified:
+        store.put_verification(metadata, detected_type, confidence)
+    
+    for video_type, tasks in speculative.items():
+        if video_type != detected_type:
+            for task in tasks:
+                task.cancel()
+    
+    analysis, summary = await asyncio.gather(*(speculative.get(detected_type) or start(detected_type)))
+    return {'type': detected_type, 'confidence': confidence, 'verified': verified,
+            'analysis': analysis, 'summary': summary}
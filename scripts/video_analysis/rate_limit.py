@@ -0,0 +1,141 @@
+"""Shared request scheduler for OpenAI calls.
+
+Every call waits for room in two token buckets, one for requests per minute
+and one for tokens per minute, before it is sent. Rate limit, timeout and
+server errors are retried with jittered exponential backoff, waiting at least
+as long as the server's Retry-After header asks.
+"""
+import asyncio
+import os
+import random
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+T = TypeVar('T')
+
+# Quotas for the default model; override to match the account's limits
+DEFAULT_RPM = int(os.getenv('OPENAI_RPM_LIMIT', '500'))
+DEFAULT_TPM = int(os.getenv('OPENAI_TPM_LIMIT', '30000'))
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+class TokenBucket:
+    """Refills ``capacity`` units evenly over each minute"""
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.available = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available"""
+        self._refill()
+        # Requests larger than the whole bucket wait for a full bucket
+        missing = min(amount, self.capacity) - self.available
+        return max(missing, 0) * 60 / self.capacity
+
+    def take(self, amount: float):
+        self._refill()
+        self.available -= amount
+
+    def pause(self, seconds: float):
+        """Treat the bucket as empty for ``seconds``, e.g. after a 429"""
+        self._refill()
+        self.available = min(self.available, -seconds * self.capacity / 60)
+
+class RateLimiter:
+    """Token-bucket scheduler shared by every OpenAI call in the process.
+
+    Waiting callers are served in arrival order; ``queue_depth`` reports how
+    many are currently waiting for budget.
+    """
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM, max_retries: int = 6,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # asyncio locks belong to one event loop, so keep one per loop
+        self._locks: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]' = weakref.WeakKeyDictionary()
+        self._waiting = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'queue_depth': self._waiting,
+            'requests_available': self.requests.available,
+            'tokens_available': self.tokens.available
+        }
+
+    async def acquire(self, tokens: int):
+        """Wait until one request and ``tokens`` tokens fit in the budget"""
+        lock = self._locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+        self._waiting += 1
+        try:
+            # The lock keeps callers in order; whoever holds it sleeps until its budget is there
+            async with lock:
+                while True:
+                    delay = max(self.requests.delay(1), self.tokens.delay(tokens))
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                self.requests.take(1)
+                self.tokens.take(tokens)
+        finally:
+            self._waiting -= 1
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        retry_after = retry_after_seconds(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """Run ``call`` within the budget, retrying rate limits and transient errors"""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(tokens)
+            try:
+                return await call()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                print(f"OpenAI {type(e).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                if isinstance(e, openai.RateLimitError):
+                    # Empty the bucket so every caller backs off, this one included, in acquire()
+                    self.requests.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the server through Retry-After / retry-after-ms headers"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,139 @@
+"""Prompt token counting, per-call budgets and usage accounting.
+
+Counts use tiktoken when it is installed and fall back to an estimate of
+four characters per token otherwise.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_USAGE_LOG = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'openai' / 'usage.jsonl'
+
+# Prompt token budgets per call type, system and user messages included
+PROMPT_BUDGETS = {
+    'verification': int(os.getenv('OPENAI_VERIFICATION_PROMPT_BUDGET', '2500')),
+    'analysis': int(os.getenv('OPENAI_ANALYSIS_PROMPT_BUDGET', '2500')),
+    'summary': int(os.getenv('OPENAI_SUMMARY_PROMPT_BUDGET', '1500'))
+}
+
+TRUNCATION_MARKER = '\n[Description truncated]'
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+def count_tokens(text: str, model: str = 'gpt-4') -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = 'gpt-4') -> int:
+    """Prompt tokens of a chat request, including the per-message framing"""
+    return sum(count_tokens(message['content'], model) + 4 for message in messages) + 3
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = 'gpt-4') -> str:
+    """Longest prefix of text within max_tokens, cut back to a line or word break"""
+    if max_tokens <= 0:
+        return ''
+    encoding = _encoding(model)
+    if encoding is None:
+        prefix = text[:max_tokens * 4]
+    else:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        prefix = encoding.decode(tokens[:max_tokens])
+    if len(prefix) >= len(text):
+        return text
+
+    # Prefer a paragraph, line or word boundary when one is reasonably close
+    for separator in ('\n\n', '\n', ' '):
+        cut = prefix.rfind(separator)
+        if cut >= len(prefix) * 0.8:
+            return prefix[:cut].rstrip()
+    return prefix
+
+def fit_to_budget(build, metadata: Dict[str, Any], budget: int, model: str = 'gpt-4') -> Dict[str, Any]:
+    """Request from build(metadata), with the description trimmed until the prompt fits budget.
+
+    Only the description is trimmed: it is the one field that grows without
+    bound, while titles and channel names are short.
+    """
+    request = build(metadata)
+    total = count_message_tokens(request['messages'], model)
+    if total <= budget or not metadata.get('description'):
+        return request
+
+    description = metadata['description']
+    available = count_tokens(description, model) - (total - budget) - count_tokens(TRUNCATION_MARKER, model)
+    trimmed = truncate_to_tokens(description, available, model)
+    request = build({**metadata, 'description': trimmed + TRUNCATION_MARKER if trimmed else ''})
+    print(f"Trimmed description of {metadata.get('videoId', 'video')} from {total} to "
+          f"{count_message_tokens(request['messages'], model)} prompt tokens", file=sys.stderr)
+    return request
+
+class UsageTracker:
+    """Running token totals per call type, optionally appended to a JSONL log"""
+    def __init__(self, log_path: Optional[Path] = None):
+        self.log_path = log_path
+        self.totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, call_type: str, model: str, usage: Any = None, estimated_prompt_tokens: Optional[int] = None,
+               cached: bool = False):
+        prompt_tokens = getattr(usage, 'prompt_tokens', None) if usage is not None else None
+        completion_tokens = getattr(usage, 'completion_tokens', None) if usage is not None else None
+        if isinstance(usage, dict):
+            prompt_tokens, completion_tokens = usage.get('prompt_tokens'), usage.get('completion_tokens')
+
+        with self._lock:
+            totals = self.totals.setdefault(call_type, {
+                'calls': 0, 'cached_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'estimated_prompt_tokens': 0
+            })
+            totals['calls'] += 1
+            totals['cached_calls'] += int(cached)
+            totals['prompt_tokens'] += prompt_tokens or 0
+            totals['completion_tokens'] += completion_tokens or 0
+            totals['estimated_prompt_tokens'] += estimated_prompt_tokens or 0
+
+            if self.log_path and not cached:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({
+                        'time': time.time(),
+                        'type': call_type,
+                        'model': model,
+                        'estimated_prompt_tokens': estimated_prompt_tokens,
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': completion_tokens
+                    }) + '\n')
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {call_type: dict(totals) for call_type, totals in self.totals.items()}
+
+_tracker: Optional[UsageTracker] = None
+
+def get_usage_tracker() -> UsageTracker:
+    """Shared tracker, logging to OPENAI_USAGE_LOG (default data/cache/openai/usage.jsonl; '0' disables it)"""
+    global _tracker
+    if _tracker is None:
+        log_path = os.getenv('OPENAI_USAGE_LOG', str(DEFAULT_USAGE_LOG))
+        _tracker = UsageTracker(Path(log_path) if log_path != '0' else None)
+    return _tracker
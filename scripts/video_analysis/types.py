@@ -150,3 +150,22 @@ TYPE_FOCUS = {
         'Context and relevance'
     ]
 }
+
+def to_video_metadata(raw: Dict) -> VideoMetadata:
+    """VideoMetadata from a stored YouTube record such as data/video_meta_<id>.json."""
+    details = raw.get('contentDetails') or {}
+    statistics = raw.get('statistics') or {}
+    return {
+        'videoId': raw.get('videoId', ''),
+        'title': raw.get('title', ''),
+        'description': raw.get('description', ''),
+        'channelTitle': raw.get('channelTitle', ''),
+        'duration': raw.get('duration') or details.get('duration', '0'),
+        'viewCount': int(raw.get('viewCount', statistics.get('viewCount', 0))),
+        'likeCount': int(raw.get('likeCount', statistics.get('likeCount', 0))),
+        'commentCount': int(raw.get('commentCount', statistics.get('commentCount', 0))),
+        'tags': raw.get('tags') or [],
+        'category': raw.get('category', ''),
+        'defaultLanguage': raw.get('defaultLanguage', ''),
+        'defaultAudioLanguage': raw.get('defaultAudioLanguage', '')
+    }
@@ -0,0 +1,311 @@
+"""In-process validation of enrichment documents.
+
+The schemas are ports of the zod schemas ``validateEnrichment`` uses in
+lib/video_validation.ts (its ``schemaMap``), built once at import into trees
+of checker functions. Verdicts, error paths and messages follow zod: objects
+require every non-optional key and drop unknown ones from ``data``, and
+``min``/``max``/``regex`` constraints report zod's messages. Results have the
+same shape: ``{'success': True, 'data': ...}`` or
+``{'success': False, 'errors': [{'path': 'steps.0.title', 'message': ...}]}``.
+Keep the two files in step when a schema changes.
+"""
+import math
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+# check(value, path, issues) -> parsed value; appends (path, message) for every problem found
+Checker = Callable[[Any, Tuple, List[Tuple[Tuple, str]]], Any]
+
+# Stands in for a key that is absent from its object (zod's undefined)
+MISSING = object()
+
+# JavaScript regexes as zod runs them with .test(): `$` is end of input and
+# `.` stops at any line terminator
+TIMESTAMP_PATTERN = re.compile(r'^([0-5][0-9]):([0-5][0-9])\Z')
+URL_PATTERN = re.compile(r'^https?://[^\n\r\u2028\u2029]+')
+
+def _type_name(value: Any) -> str:
+    """zod's name for the type of a parsed JSON value"""
+    if value is MISSING:
+        return 'undefined'
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'nan' if isinstance(value, float) and math.isnan(value) else 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, list):
+        return 'array'
+    if isinstance(value, dict):
+        return 'object'
+    return type(value).__name__
+
+def _invalid_type(expected: str, value: Any, path: Tuple, issues: List) -> None:
+    message = 'Required' if value is MISSING else f"Expected {expected}, received {_type_name(value)}"
+    issues.append((path, message))
+
+def _string(min_length: int = 0, message: Optional[str] = None,
+            pattern: Optional[Pattern] = None, pattern_message: str = 'Invalid') -> Checker:
+    """z.string(), optionally with .min(min_length, message) and .regex(pattern, pattern_message)"""
+    def check(value, path, issues):
+        if not isinstance(value, str):
+            return _invalid_type('string', value, path, issues)
+        if len(value) < min_length:
+            issues.append((path, message or f"String must contain at least {min_length} character(s)"))
+        if pattern is not None and not pattern.search(value):
+            issues.append((path, pattern_message))
+        return value
+    return check
+
+def _number(minimum: Optional[float] = None, maximum: Optional[float] = None) -> Checker:
+    """z.number() with optional .min() and .max()"""
+    def check(value, path, issues):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+            return _invalid_type('number', value, path, issues)
+        if minimum is not None and value < minimum:
+            issues.append((path, f"Number must be greater than or equal to {minimum}"))
+        if maximum is not None and value > maximum:
+            issues.append((path, f"Number must be less than or equal to {maximum}"))
+        return value
+    return check
+
+def _array(item: Checker, min_length: int = 0, message: Optional[str] = None) -> Checker:
+    """z.array(item), optionally with .min(min_length, message)"""
+    def check(value, path, issues):
+        if not isinstance(value, list):
+            return _invalid_type('array', value, path, issues)
+        # zod reports the length before the elements
+        if len(value) < min_length:
+            issues.append((path, message or f"Array must contain at least {min_length} element(s)"))
+        return [item(element, path + (index,), issues) for index, element in enumerate(value)]
+    return check
+
+def _object(fields: Dict[str, Checker]) -> Checker:
+    """z.object(fields): unknown keys are stripped from the result"""
+    items = tuple(fields.items())
+    def check(value, path, issues):
+        if not isinstance(value, dict):
+            return _invalid_type('object', value, path, issues)
+        parsed = {}
+        for key, field in items:
+            result = field(value.get(key, MISSING), path + (key,), issues)
+            if result is not MISSING:
+                parsed[key] = result
+        return parsed
+    return check
+
+def _record(item: Checker) -> Checker:
+    """z.record(item)"""
+    def check(value, path, issues):
+        if not isinstance(value, dict):
+            return _invalid_type('object', value, path, issues)
+        return {key: item(element, path + (key,), issues) for key, element in value.items()}
+    return check
+
+def _optional(inner: Checker) -> Checker:
+    """.optional(): an absent key is accepted and left out of the result"""
+    def check(value, path, issues):
+        if value is MISSING:
+            return MISSING
+        return inner(value, path, issues)
+    return check
+
+# Shared schemas
+resource_schema = _object({
+    'url': _string(pattern=URL_PATTERN, pattern_message='Invalid URL format'),
+    'description': _string(1, 'Description is required')
+})
+
+product_details_schema = _object({
+    'name': _string(1, 'Product name is required'),
+    'category': _string(1, 'Category is required'),
+    'price': _optional(_string()),
+    'specs': _optional(_record(_string()))
+})
+
+def _key_features(message: Optional[str] = None) -> Checker:
+    return _array(_object({
+        'feature': _string(1, 'Feature name is required'),
+        'rating': _number(1, 5),
+        'comments': _string(1, 'Comments are required')
+    }), 1, message)
+
+pros_and_cons_schema = _object({
+    'pros': _array(_string(), 1, 'At least one pro is required'),
+    'cons': _array(_string(), 1, 'At least one con is required')
+})
+
+verdict_schema = _object({
+    'rating': _number(1, 10),
+    'summary': _string(1, 'Verdict summary is required'),
+    'recommendedFor': _array(_string(), 1, 'At least one recommendation is required')
+})
+
+# Schema map for each video type, as in lib/video_validation.ts
+SCHEMAS: Dict[str, Checker] = {
+    'product': _object({
+        'productDetails': product_details_schema,
+        'keyFeatures': _key_features(),
+        'prosAndCons': pros_and_cons_schema,
+        'comparisons': _array(_object({
+            'product': _string(1, 'Compared product name is required'),
+            'differences': _array(_string(), 1, 'At least one difference is required')
+        })),
+        'verdict': verdict_schema
+    }),
+    'tutorial': _object({
+        'prerequisites': _array(_string(), 1, 'At least one prerequisite is required'),
+        'keyLearnings': _array(_string(), 1, 'At least one key learning is required'),
+        'steps': _array(_object({
+            'title': _string(1, 'Step title is required'),
+            'description': _string(1, 'Step description is required'),
+            'timeStamp': _optional(_string(pattern=TIMESTAMP_PATTERN, pattern_message='Invalid timestamp format'))
+        }), 1, 'At least one step is required'),
+        'technicalDetails': _object({
+            'tools': _array(_string()),
+            'versions': _array(_string()),
+            'platforms': _array(_string())
+        }),
+        'resources': _array(resource_schema)
+    }),
+    'commentary': _object({
+        'keyMoments': _array(_object({
+            'timestamp': _optional(_string(pattern=TIMESTAMP_PATTERN, pattern_message='Invalid timestamp format')),
+            'description': _string(1, 'Description is required'),
+            'significance': _string(1, 'Significance is required')
+        })),
+        'mainPoints': _array(_object({
+            'point': _string(1, 'Point is required'),
+            'context': _string(1, 'Context is required')
+        }), 1, 'At least one main point is required'),
+        'culturalReferences': _array(_object({
+            'reference': _string(1, 'Reference is required'),
+            'explanation': _string(1, 'Explanation is required')
+        })),
+        'audience': _object({
+            'primary': _array(_string(), 1, 'At least one primary audience is required'),
+            'interests': _array(_string(), 1, 'At least one interest is required')
+        }),
+        'moodAndTone': _object({
+            'overall': _string(1, 'Overall tone is required'),
+            'contentWarnings': _optional(_array(_string()))
+        })
+    }),
+    'news': _object({
+        'summary': _object({
+            'headline': _string(1, 'Headline is required'),
+            'keyPoints': _array(_string(), 1, 'At least one key point is required')
+        }),
+        'context': _object({
+            'background': _string(1, 'Background information is required'),
+            'relatedEvents': _array(_string())
+        }),
+        'factCheck': _object({
+            'claims': _array(_object({
+                'claim': _string(1, 'Claim is required'),
+                'verification': _string(1, 'Verification is required'),
+                'source': _string(1, 'Source is required')
+            }))
+        }),
+        'impact': _object({
+            'immediate': _array(_string()),
+            'longTerm': _array(_string()),
+            'affectedGroups': _array(_string(), 1, 'At least one affected group is required')
+        }),
+        'sources': _array(_object({
+            'name': _string(1, 'Source name is required'),
+            'url': _optional(_string(pattern=URL_PATTERN, pattern_message='Invalid URL format')),
+            'credibility': _string(1, 'Credibility assessment is required')
+        }), 1, 'At least one source is required')
+    }),
+    'recipe': _object({
+        'recipe': _object({
+            'name': _string(1, 'Recipe name is required'),
+            'servings': _string(1, 'Number of servings is required'),
+            'prepTime': _string(1, 'Preparation time is required'),
+            'cookTime': _string(1, 'Cooking time is required'),
+            'totalTime': _string(1, 'Total time is required'),
+            'ingredients': _array(_object({
+                'item': _string(1, 'Ingredient name is required'),
+                'amount': _string(1, 'Amount is required'),
+                'notes': _optional(_string())
+            }), 1, 'At least one ingredient is required'),
+            'instructions': _array(_object({
+                'step': _string(1, 'Step description is required'),
+                'details': _string(1, 'Step details are required'),
+                'timestamp': _optional(_string(pattern=TIMESTAMP_PATTERN, pattern_message='Invalid timestamp format')),
+                'tips': _optional(_array(_string()))
+            }), 1, 'At least one instruction step is required'),
+            'nutrition': _optional(_object({
+                'calories': _optional(_string()),
+                'protein': _optional(_string()),
+                'carbs': _optional(_string()),
+                'fat': _optional(_string())
+            }))
+        }),
+        'tips': _array(_string(), 1, 'At least one tip is required'),
+        'substitutions': _optional(_array(_object({
+            'ingredient': _string(1, 'Ingredient name is required'),
+            'alternatives': _array(_string(), 1, 'At least one alternative is required')
+        }))),
+        'equipment': _array(_string(), 1, 'At least one piece of equipment is required')
+    }),
+    'review': _object({
+        'productDetails': product_details_schema,
+        'keyFeatures': _key_features('At least one key feature is required'),
+        'prosAndCons': pros_and_cons_schema,
+        'verdict': verdict_schema
+    }),
+    'comparison': _object({
+        'products': _array(product_details_schema, 2, 'At least two products are required for comparison'),
+        'comparisonPoints': _array(_object({
+            'feature': _string(1, 'Feature name is required'),
+            'importance': _number(1, 10),
+            'comparison': _string(1, 'Comparison details are required'),
+            'winner': _string(1, 'Winner must be specified')
+        }), 1, 'At least one comparison point is required'),
+        'winners': _array(_object({
+            'category': _string(1, 'Category name is required'),
+            'winner': _string(1, 'Winner must be specified'),
+            'explanation': _string(1, 'Explanation is required')
+        }), 1, 'At least one winner category is required'),
+        'verdict': _object({
+            'bestOverall': _string(1, 'Best overall product must be specified'),
+            'bestValue': _string(1, 'Best value product must be specified'),
+            'situationalRecommendations': _array(_object({
+                'scenario': _string(1, 'Scenario description is required'),
+                'recommendation': _string(1, 'Recommendation is required'),
+                'reason': _string(1, 'Reason is required')
+            }), 1, 'At least one situational recommendation is required')
+        })
+    })
+}
+
+def _result(check: Checker, data: Any) -> Dict[str, Any]:
+    issues = []
+    parsed = check(data, (), issues)
+    if issues:
+        return {
+            'success': False,
+            'errors': [{'path': '.'.join(map(str, path)), 'message': message} for path, message in issues]
+        }
+    return {'success': True, 'data': parsed}
+
+def _invalid_video_type(video_type: str) -> Dict[str, Any]:
+    return {'success': False, 'errors': [{'path': '', 'message': f"Invalid video type: {video_type}"}]}
+
+def validate_enrichment(video_type: str, data: Any) -> Dict[str, Any]:
+    """Validate one enrichment document against its video type's schema"""
+    check = SCHEMAS.get(str(video_type))
+    if check is None:
+        return _invalid_video_type(video_type)
+    return _result(check, data)
+
+def validate_many(video_type: str, documents: Iterable[Any]) -> List[Dict[str, Any]]:
+    """validate_enrichment for many documents of one type, in order"""
+    check = SCHEMAS.get(str(video_type))
+    if check is None:
+        return [_invalid_video_type(video_type) for _ in documents]
+    return [_result(check, document) for document in documents]
@@ -0,0 +1,115 @@
+"""Checks that BatchRunner.resume recovers from a crash part way through a submit.
+
+    python -m unittest tests/test_batch.py
+
+The Batch API is replaced by an in-memory client; the tests run when the
+openai package is installed.
+"""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / 'scripts'))
+
+METADATA = {
+    'videoId': 'abc123',
+    'title': 'How to write a CLI in Python',
+    'description': 'Step by step tutorial',
+    'channelTitle': 'Code Academy',
+    'duration': '12:00'
+}
+
+class Crash(Exception):
+    """Stands in for the process dying"""
+
+class FakeBatchClient:
+    """In-memory Files and Batches API; every batch has finished by the time it is listed.
+
+    ``crash`` is 'after' to die once batches.create has reached the server.
+    """
+    def __init__(self, crash=None):
+        self.crash = crash
+        self.stored = {}
+        self.created = {}
+        self.ids = 0
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, list=self._list_batches, retrieve=self._retrieve_batch)
+
+    def _next_id(self, prefix):
+        self.ids += 1
+        return f'{prefix}{self.ids}'
+
+    def _create_file(self, file, purpose):
+        file_id = self._next_id('file')
+        self.stored[file_id] = file[1].decode('utf-8')
+        return SimpleNamespace(id=file_id)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self.stored[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window, metadata):
+        batch_id = self._next_id('batch')
+        self.created[batch_id] = SimpleNamespace(
+            id=batch_id, input_file_id=input_file_id, metadata=metadata, created_at=int(time.time())
+        )
+        if self.crash == 'after':
+            self.crash = None
+            raise Crash()
+        return SimpleNamespace(id=batch_id, status='validating')
+
+    def _list_batches(self, limit=100):
+        for batch in reversed(list(self.created.values())):
+            yield SimpleNamespace(**vars(batch), status='completed')
+
+    def _retrieve_batch(self, batch_id):
+        batch = self.created[batch_id]
+        output = []
+        for line in self.stored[batch.input_file_id].splitlines():
+            custom_id = json.loads(line)['custom_id']
+            content = '{"steps": []}' if custom_id.endswith(':analysis') else 'A short summary'
+            output.append(json.dumps({'custom_id': custom_id, 'response': {'status_code': 200, 'body': {
+                'model': 'gpt-4', 'choices': [{'message': {'content': content}, 'finish_reason': 'stop'}]
+            }}}))
+        output_file_id = self._next_id('file')
+        self.stored[output_file_id] = '\n'.join(output)
+        return SimpleNamespace(status='completed', output_file_id=output_file_id, error_file_id=None)
+
+@unittest.skipUnless(importlib.util.find_spec('openai'), 'openai is not installed')
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        environment = mock.patch.dict(os.environ, {'OPENAI_RESPONSE_CACHE': '0', 'OPENAI_USAGE_LOG': '0'})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+        from video_analysis import batch
+        from video_analysis.types import VideoType, to_video_metadata
+        self.batch = batch
+        self.store = batch.BatchJobStore(Path(directory.name) / 'batches.sqlite')
+        self.addCleanup(self.store.close)
+        self.requests = batch.build_requests([to_video_metadata(METADATA)], VideoType.TUTORIAL)
+
+    def test_batch_finished_before_resume_is_collected(self):
+        client = FakeBatchClient(crash='after')
+        with self.assertRaises(Crash):
+            self.batch.BatchRunner(self.store, client).submit(self.requests)
+        self.assertEqual(self.store.counts(), {'submitting': 2})
+
+        counts = self.batch.BatchRunner(self.store, client).resume(interval=0)
+        self.assertEqual(counts, {'completed': 2})
+        self.assertEqual(len(client.created), 1)
+        self.assertEqual(self.store.results(), {'abc123': {
+            'videoId': 'abc123', 'type': 'tutorial', 'analysis': {'steps': []}, 'summary': 'A short summary'
+        }})
+
+if __name__ == '__main__':
+    unittest.main()
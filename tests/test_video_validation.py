@@ -0,0 +1,147 @@
+"""Checks the Python enrichment validator against lib/video_validation.ts.
+
+    python -m unittest tests/test_video_validation.py
+
+The native verdicts are checked on their own; the comparison with zod runs
+when node_modules is installed, through the same ts-node bridge
+scripts/video_analysis.py uses.
+"""
+import copy
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / 'scripts'))
+
+from video_analysis.validation import SCHEMAS, validate_enrichment, validate_many
+
+VALID_DOCUMENTS = {
+    'tutorial': {
+        'prerequisites': ['Python 3.11'],
+        'keyLearnings': ['Write a CLI'],
+        'steps': [
+            {'title': 'Install', 'description': 'pip install click', 'timeStamp': '01:30'},
+            {'title': 'Run', 'description': 'Call the command'}
+        ],
+        'technicalDetails': {'tools': ['pip'], 'versions': [], 'platforms': ['linux']},
+        'resources': [{'url': 'https://click.palletsprojects.com', 'description': 'Docs'}]
+    },
+    'review': {
+        'productDetails': {'name': 'Phone X', 'category': 'phones', 'specs': {'ram': '8GB'}},
+        'keyFeatures': [{'feature': 'Camera', 'rating': 4.5, 'comments': 'Sharp'}],
+        'prosAndCons': {'pros': ['Battery'], 'cons': ['Price']},
+        'verdict': {'rating': 8, 'summary': 'Good', 'recommendedFor': ['Photographers']}
+    },
+    'news': {
+        'summary': {'headline': 'Launch', 'keyPoints': ['It launched']},
+        'context': {'background': 'Years of work', 'relatedEvents': []},
+        'factCheck': {'claims': [{'claim': 'First', 'verification': 'True', 'source': 'Agency'}]},
+        'impact': {'immediate': [], 'longTerm': [], 'affectedGroups': ['Users']},
+        'sources': [{'name': 'Agency', 'url': 'http://agency.example', 'credibility': 'High'}]
+    },
+    'recipe': {
+        'recipe': {
+            'name': 'Bread', 'servings': '4', 'prepTime': '10m', 'cookTime': '30m', 'totalTime': '40m',
+            'ingredients': [{'item': 'Flour', 'amount': '500g'}],
+            'instructions': [{'step': 'Mix', 'details': 'Mix well', 'tips': ['Use warm water']}]
+        },
+        'tips': ['Rest the dough'],
+        'equipment': ['Oven']
+    }
+}
+
+def _invalid_documents():
+    """(type, document) pairs that zod rejects, one kind of problem each"""
+    tutorial = VALID_DOCUMENTS['tutorial']
+    review = VALID_DOCUMENTS['review']
+    cases = []
+
+    def variant(base, edit):
+        document = copy.deepcopy(base)
+        edit(document)
+        return document
+
+    cases.append(('tutorial', variant(tutorial, lambda d: d.pop('technicalDetails'))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d.update(prerequisites=[]))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d['steps'][0].update(title=''))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d['steps'][1].update(timeStamp='1:30'))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d['steps'][1].update(timeStamp='01:30\n'))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d['resources'][0].update(url='ftp://x'))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d['technicalDetails'].update(tools='pip'))))
+    cases.append(('tutorial', variant(tutorial, lambda d: d.update(steps=[], keyLearnings=None))))
+    cases.append(('review', variant(review, lambda d: d['keyFeatures'][0].update(rating=7))))
+    cases.append(('review', variant(review, lambda d: d['verdict'].update(rating=True))))
+    cases.append(('review', variant(review, lambda d: d['productDetails'].update(specs={'ram': 8}))))
+    cases.append(('review', variant(review, lambda d: d['productDetails'].update(price=None))))
+    cases.append(('news', variant(VALID_DOCUMENTS['news'], lambda d: d['sources'][0].update(url='agency'))))
+    cases.append(('comparison', {'products': [review['productDetails']], 'comparisonPoints': []}))
+    cases.append(('tutorial', []))
+    cases.append(('vlog', {}))
+    return cases
+
+INVALID_DOCUMENTS = _invalid_documents()
+
+class NativeValidationTest(unittest.TestCase):
+    def test_valid_documents_pass(self):
+        for video_type, document in VALID_DOCUMENTS.items():
+            with self.subTest(video_type=video_type):
+                self.assertTrue(validate_enrichment(video_type, document)['success'])
+
+    def test_invalid_documents_fail(self):
+        for video_type, document in INVALID_DOCUMENTS:
+            with self.subTest(video_type=video_type, document=document):
+                self.assertFalse(validate_enrichment(video_type, document)['success'])
+
+    def test_error_paths_and_messages(self):
+        document = copy.deepcopy(VALID_DOCUMENTS['tutorial'])
+        document['steps'][0]['title'] = ''
+        document['resources'][0]['url'] = 'ftp://x'
+        del document['technicalDetails']
+        self.assertEqual(validate_enrichment('tutorial', document)['errors'], [
+            {'path': 'steps.0.title', 'message': 'Step title is required'},
+            {'path': 'technicalDetails', 'message': 'Required'},
+            {'path': 'resources.0.url', 'message': 'Invalid URL format'}
+        ])
+
+    def test_unknown_keys_are_stripped(self):
+        document = {**VALID_DOCUMENTS['tutorial'], 'type': 'tutorial'}
+        self.assertNotIn('type', validate_enrichment('tutorial', document)['data'])
+
+    def test_validate_many_matches_single_calls(self):
+        documents = [VALID_DOCUMENTS['tutorial']] + [d for t, d in INVALID_DOCUMENTS if t == 'tutorial']
+        self.assertEqual(
+            validate_many('tutorial', documents),
+            [validate_enrichment('tutorial', document) for document in documents]
+        )
+
+def _load_wrapper():
+    # scripts/video_analysis.py is shadowed by the video_analysis package
+    spec = importlib.util.spec_from_file_location('video_analysis_wrapper', ROOT_DIR / 'scripts' / 'video_analysis.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@unittest.skipUnless((ROOT_DIR / 'node_modules' / 'zod').exists() and (ROOT_DIR / 'node_modules' / 'ts-node').exists(),
+                     'node_modules is not installed')
+class ZodParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.wrapper = _load_wrapper()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.wrapper.get_ts_bridge().close()
+
+    def test_native_and_zod_agree(self):
+        cases = list(VALID_DOCUMENTS.items()) + INVALID_DOCUMENTS
+        for video_type in SCHEMAS:
+            cases.append((video_type, {}))
+        for video_type, document in cases:
+            with self.subTest(video_type=video_type, document=document):
+                expected = self.wrapper.run_ts_script('video_validation', {'content': document, 'type': video_type})
+                self.assertEqual(validate_enrichment(video_type, document), expected)
+
+if __name__ == '__main__':
+    unittest.main()